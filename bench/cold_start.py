@@ -0,0 +1,77 @@
+"""Import-time report for the Streamlit entry point.
+
+    python -m bench.cold_start              # deferred imports vs loading everything up front
+    python -m bench.cold_start --top 20     # also list the slowest top-level imports
+
+Each measurement runs the entry point's import statements in a fresh
+interpreter under `python -X importtime` and takes the median of several
+runs. The "eager" variant additionally imports the dependencies that the app
+now loads on first use, which is what every cold start and worker spawn paid
+before.
+"""
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ENTRY_POINT = Path(__file__).resolve().parent.parent / "combined-hr-assistant-full.py"
+# loaded on first use: PDF extraction, CSV upload / batch table, voice input, first OpenAI call, first download
+DEFERRED = ["fitz", "PyPDF2", "pandas", "speech_recognition", "openai", "requests"]
+
+
+def entry_point_imports(path=ENTRY_POINT):
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_times(code):
+    """(total seconds, {top-level module: cumulative seconds}) for one fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ENTRY_POINT.parent, capture_output=True, text=True, check=True,
+    )
+    total, top = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        if not name.startswith("  "):  # nesting is shown by indentation
+            top[name.strip()] = int(cumulative_us) / 1e6
+    return total / 1e6, top
+
+
+def median_run(code, repeat):
+    runs = [import_times(code) for _ in range(repeat)]
+    totals = [total for total, _ in runs]
+    return statistics.median(totals), runs[totals.index(statistics.median_low(totals))][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest top-level imports")
+    args = parser.parse_args()
+
+    code = entry_point_imports()
+    deferred, top = median_run(code, args.repeat)
+    eager, _ = median_run(code + "\n" + "\n".join(f"import {m}" for m in DEFERRED), args.repeat)
+    print(f"{'entry point imports (deferred)':<40}{deferred * 1000:8.0f} ms")
+    print(f"{'  + deferred dependencies (eager)':<40}{eager * 1000:8.0f} ms")
+    print(f"{'cold-start reduction':<40}{(eager - deferred) * 1000:8.0f} ms ({1 - deferred / eager:.0%})")
+
+    print("\nfirst-use cost of each deferred dependency:")
+    for module in DEFERRED:
+        cost, _ = median_run(code + f"\nimport {module}", args.repeat)
+        print(f"  {module:<38}{(cost - deferred) * 1000:8.0f} ms")
+
+    if args.top:
+        print("\nslowest top-level imports (deferred):")
+        for name, seconds in sorted(top.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<38}{seconds * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Synthetic, reproducible benchmark corpus.
+
+    python -m bench.corpus                  # every size into bench/corpus/
+    python -m bench.corpus --size small
+
+Each size holds a knowledge base handbook, resumes, job descriptions (all
+PDFs) and an events CSV with the "Event Name", "Description", "Date" and
+"Location" columns the app reads. Documents are generated from a fixed seed
+and use the skills vocabulary, so the career match takes the same
+structured pre-score path as real resumes. Files are written once and
+reused; delete the folder to regenerate.
+"""
+import argparse
+import csv
+import random
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from valleyhelps.skills import SKILLS
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+SIZES = {
+    # handbook pages, resumes, job descriptions, events
+    "small": (10, 8, 2, 50),
+    "medium": (60, 32, 4, 500),
+    "large": (400, 128, 8, 5000),
+}
+SEED = 2024
+
+HANDBOOK_SECTION = (
+    "Section {n}. {topic}. Employees covered by this Memorandum of Understanding shall accrue "
+    "{topic_lower} at the rates set out below. Requests are submitted to the supervisor at least "
+    "{days} working days in advance and are not unreasonably denied. Disputes over {topic_lower} "
+    "follow the grievance procedure in Article {article}. "
+)
+TOPICS = [
+    "Vacation leave", "Sick leave", "Overtime compensation", "Holiday pay", "Bereavement leave",
+    "Jury duty", "Standby pay", "Shift differential", "Tuition reimbursement", "Telework",
+    "Safety equipment", "Uniform allowance", "Probationary period", "Layoff procedure",
+]
+TITLES = [
+    "Associate Civil Engineer", "Water Quality Specialist", "GIS Analyst", "Senior Accountant",
+    "Project Manager", "Human Resources Analyst", "SCADA Technician", "Environmental Planner",
+]
+DEGREES = ["Bachelor of Science", "Master of Science", "Associate degree"]
+EVENT_KINDS = ["Workshop", "Webinar", "Lunch and Learn", "Certification Prep", "Field Tour", "Mentoring Circle"]
+LOCATIONS = ["Headquarters Boardroom", "Rinconada Water Treatment Plant", "Online", "Vasona Training Room"]
+
+
+def pdf_bytes(pages):
+    """A PDF with one text page per string in `pages`."""
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (54, 54, -54, -54), text, fontsize=9)
+    return doc.tobytes()
+
+
+def handbook(rng, pages):
+    texts = []
+    for n in range(pages):
+        topic = TOPICS[n % len(TOPICS)]
+        section = HANDBOOK_SECTION.format(
+            n=n + 1, topic=topic, topic_lower=topic.lower(), days=rng.randint(2, 15), article=rng.randint(1, 40),
+        )
+        texts.append(section * 10)
+    return texts
+
+
+def resume(rng, n):
+    skills = rng.sample(sorted(SKILLS), 8)
+    return [
+        f"Candidate {n}\n{rng.choice(TITLES)}\n\n"
+        f"Summary\n{rng.randint(2, 20)} years of experience delivering public sector projects.\n\n"
+        f"Skills\n{', '.join(skills)}\n\n"
+        f"Experience\n" + "".join(
+            f"- Led {skill} work for a {rng.choice(['regional', 'county', 'municipal'])} water agency.\n"
+            for skill in skills[:5]
+        ) + f"\nEducation\n{rng.choice(DEGREES)} in Civil Engineering\n"
+    ]
+
+
+def job_description(rng, n):
+    skills = rng.sample(sorted(SKILLS), 10)
+    return [
+        f"{TITLES[n % len(TITLES)]}\n\n"
+        f"Minimum Qualifications\n{rng.randint(2, 8)} years of experience. Bachelor's degree required.\n\n"
+        f"Required Skills\n{', '.join(skills[:7])}\n\n"
+        f"Preferred Qualifications\n{', '.join(skills[7:])}\n"
+    ]
+
+
+def events(rng, count):
+    rows = []
+    for n in range(count):
+        skill = rng.choice(sorted(SKILLS))
+        kind = rng.choice(EVENT_KINDS)
+        rows.append({
+            "Event Name": f"{skill.title()} {kind} #{n}",
+            "Description": f"A {kind.lower()} on {skill} for staff building toward {rng.choice(TITLES).lower()} roles.",
+            "Date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Location": rng.choice(LOCATIONS),
+        })
+    return rows
+
+
+def build(size, directory=CORPUS_DIR):
+    """Write the corpus for `size` unless it exists; returns its directory."""
+    out = Path(directory) / size
+    if (out / "events.csv").exists():
+        return out
+    pages, resumes, jobs, event_count = SIZES[size]
+    rng = random.Random(f"{SEED}-{size}")
+    (out / "resumes").mkdir(parents=True, exist_ok=True)
+    (out / "jobs").mkdir(exist_ok=True)
+    (out / "handbook.pdf").write_bytes(pdf_bytes(handbook(rng, pages)))
+    for n in range(resumes):
+        (out / "resumes" / f"resume_{n:03d}.pdf").write_bytes(pdf_bytes(resume(rng, n)))
+    for n in range(jobs):
+        (out / "jobs" / f"job_{n:02d}.pdf").write_bytes(pdf_bytes(job_description(rng, n)))
+    # written last: its presence marks the corpus complete
+    with open(out / "events.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, ["Event Name", "Description", "Date", "Location"])
+        writer.writeheader()
+        writer.writerows(events(rng, event_count))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=[*SIZES, "all"], default="all")
+    parser.add_argument("--out", type=Path, default=CORPUS_DIR)
+    args = parser.parse_args()
+    for size in SIZES if args.size == "all" else [args.size]:
+        out = build(size, args.out)
+        files = [p for p in out.rglob("*") if p.is_file()]
+        print(f"{size:<8}{len(files):5d} files {sum(p.stat().st_size for p in files) / 1024:8.0f} KB  {out}")
+
+
+if __name__ == "__main__":
+    main()
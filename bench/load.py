@@ -0,0 +1,333 @@
+"""Concurrent-session load test against the local OpenAI stand-in.
+
+    python -m bench.load --sessions 8 --rounds 3 --size small
+    python -m bench.load --size medium --rpm 300 --json before.json
+    python -m bench.load --size medium --rpm 300 --compare before.json
+
+Starts bench.mock_openai in a subprocess (or uses --base-url), builds the
+synthetic corpus, and loads its handbook as the knowledge base. N sessions
+then run on threads, the way Streamlit runs each session's script. Each round
+of a session mirrors the app's flow through the same valleyhelps calls as
+the UI helpers: extract a resume and a job PDF (extract_text_from_pdf),
+ask a few questions (query_openai / stream_openai), run the career match
+and score the events CSV (analyze_event_relevance). With --voice it also
+synthesizes the reply and transcribes a recording.
+
+Reports per-operation p50/p95 latency, throughput, peak memory and the
+instrumented stage breakdown. Caches start empty in a temporary working
+directory, so runs are comparable; --json saves the results and --compare
+prints the change against a saved run.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+from bench import corpus
+from bench.mock_openai import add_arguments, server_options
+
+QUESTIONS = [
+    "How much vacation do I accrue each month?",
+    "What is the overtime rate?",
+    "Can I use sick leave to care for a family member?",
+    "How does standby pay work?",
+    "What happens during the probationary period?",
+    "Is tuition reimbursement available?",
+    "What is the telework policy?",
+    "How is holiday pay calculated?",
+]
+GOALS = ["Become a senior civil engineer", "Move into project management", "Lead a GIS team", "Become an HR manager"]
+ROOT = Path(__file__).resolve().parent.parent
+NOT_CALLS = ("kb load", "events index", "chat first token")  # setup, or part of another operation
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+# ─── Mock Server ────────────────────────────────────────────────────────────────
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args):
+    port = free_port()
+    command = [sys.executable, "-m", "bench.mock_openai", "--port", str(port)]
+    for name, value in server_options(args).items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, cwd=ROOT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while True:
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            return process, f"{url}/v1"
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                sys.exit("The mock OpenAI server did not start")
+            time.sleep(0.1)
+
+
+def mock_stats(base_url):
+    try:
+        with urllib.request.urlopen(base_url.removesuffix("/v1") + "/health", timeout=2) as r:
+            return json.load(r)
+    except (OSError, ValueError):
+        return {}
+
+
+# ─── Sessions ───────────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def time(self, operation, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.errors[operation] += 1
+            print(f"{operation} failed: {e}", file=sys.stderr)
+            return None
+        with self._lock:
+            self.latencies[operation].append(time.perf_counter() - start)
+        return result
+
+    def add(self, operation, seconds):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+
+
+def stream_reply(recorder, chunks):
+    # time to first token is what the user waits on before the reply starts drawing
+    start = time.perf_counter()
+    parts = []
+    for chunk in chunks:
+        if not parts:
+            recorder.add("chat first token", time.perf_counter() - start)
+        parts.append(chunk)
+    return "".join(parts)
+
+
+def run_session(n, args, workload, recorder):
+    from valleyhelps import core
+    from valleyhelps.pdf import cached_pdf_text
+    from valleyhelps.skills import prescore
+    from valleyhelps.speech import openai_synthesizer
+
+    rng = random.Random(n)
+    client = core.openai_client()
+    resumes, jobs = workload["resumes"], workload["jobs"]
+    for round_ in range(args.rounds):
+        resume_pdf = resumes[(n * args.rounds + round_) % len(resumes)]
+        job_pdf = jobs[(n + round_) % len(jobs)]
+        resume_text = recorder.time("extract pdf", cached_pdf_text, resume_pdf)
+        job_text = recorder.time("extract pdf", cached_pdf_text, job_pdf)
+
+        history = []
+        for question in rng.sample(QUESTIONS, args.questions):
+            if args.no_stream:
+                reply = recorder.time("chat", core.chat, client, question, history, workload["kb_index"])
+            else:
+                reply = recorder.time(
+                    "chat", lambda: stream_reply(recorder, core.stream_chat(client, question, history, workload["kb_index"]))
+                )
+            history += [{"role": "user", "content": question}, {"role": "assistant", "content": reply or ""}]
+            if args.voice and reply:
+                recorder.time("tts", openai_synthesizer(client), reply)
+                recorder.time("transcribe", transcribe, client, workload["recording"])
+
+        if resume_text and job_text:
+            goal = rng.choice(GOALS)
+            analysis = recorder.time(
+                "career match", core.career_match, client, resume_text, job_text,
+                comparison=prescore(resume_text, job_text),
+            )
+            if analysis:
+                recorder.time(
+                    "event relevance", core.recommend_events, os.environ["OPENAI_API_KEY"],
+                    workload["events"], analysis, goal, workload["events_index"],
+                )
+
+
+def transcribe(client, audio):
+    from valleyhelps.scheduler import scheduler
+
+    return scheduler.call(
+        "transcriptions", client.audio.transcriptions.with_raw_response.create,
+        model="whisper-1", file=("recording.wav", audio),
+    ).text
+
+
+def prepare(args, recorder):
+    """Corpus bytes, the knowledge base index and the events index, built once as the app does."""
+    from valleyhelps import core
+    from valleyhelps.events import build_event_index
+    from valleyhelps.kb_store import kb_store
+    from valleyhelps.pdf import cached_pdf_text
+    from valleyhelps.retrieval import KB_USE_EMBEDDINGS
+
+    directory = corpus.build(args.size)
+    with open(directory / "events.csv", newline="", encoding="utf-8") as f:
+        rows = [(i, row["Event Name"], row["Description"]) for i, row in enumerate(csv.DictReader(f))]
+
+    def load_kb():
+        doc_id = kb_store.put(cached_pdf_text((directory / "handbook.pdf").read_bytes()), "handbook.pdf")
+        embed = core.embedder(core.openai_client()) if KB_USE_EMBEDDINGS else None
+        return kb_store.index((doc_id,), embed=embed)
+
+    return {
+        "resumes": [p.read_bytes() for p in sorted((directory / "resumes").glob("*.pdf"))],
+        "jobs": [p.read_bytes() for p in sorted((directory / "jobs").glob("*.pdf"))],
+        "events": rows,
+        "events_index": recorder.time("events index", build_event_index, rows),
+        "kb_index": recorder.time("kb load", load_kb),
+        "recording": b"RIFF" + b"\x00" * 32000,
+    }
+
+
+# ─── Report ─────────────────────────────────────────────────────────────────────
+def summarize(recorder, wall, sessions_done):
+    operations = {}
+    for operation, values in sorted(recorder.latencies.items()):
+        operations[operation] = {
+            "count": len(values),
+            "errors": recorder.errors.get(operation, 0),
+            "p50_ms": round(percentile(values, 0.5) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+    for operation, errors in recorder.errors.items():
+        operations.setdefault(operation, {"count": 0, "errors": errors, "p50_ms": None, "p95_ms": None, "max_ms": None})
+    calls = sum(op["count"] for name, op in operations.items() if name not in NOT_CALLS)
+    return {
+        "operations": operations,
+        "wall_s": round(wall, 2),
+        "sessions_per_min": round(sessions_done / wall * 60, 1),
+        "operations_per_s": round(calls / wall, 2),
+    }
+
+
+def print_report(result, previous=None):
+    def delta(now, before, lower_is_better=True):
+        if previous is None or now is None or not before:
+            return ""
+        change = (now - before) / before
+        better = change < 0 if lower_is_better else change > 0
+        return f" ({change:+.0%}{'' if abs(change) < 0.02 else ' better' if better else ' worse'})"
+
+    before_ops = (previous or {}).get("operations", {})
+    print(f"\n{'operation':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, op in result["operations"].items():
+        fmt = lambda v: f"{v:10.1f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<20}{op['count']:7d}{op['errors']:8d}{fmt(op['p50_ms'])}{fmt(op['p95_ms'])}{fmt(op['max_ms'])}"
+              f"{delta(op['p95_ms'], before_ops.get(name, {}).get('p95_ms'))}")
+    previous = previous or {}
+    print(f"\nwall time {result['wall_s']} s, {result['sessions_per_min']} sessions/min"
+          f"{delta(result['sessions_per_min'], previous.get('sessions_per_min'), lower_is_better=False)}, "
+          f"{result['operations_per_s']} operations/s")
+    if result.get("peak_rss_mb") is not None:
+        print(f"peak RSS {result['peak_rss_mb']:.0f} MB (before load {result['baseline_rss_mb']:.0f} MB)"
+              f"{delta(result['peak_rss_mb'], previous.get('peak_rss_mb'))}")
+    server = result.get("server", {})
+    if server:
+        print(f"mock server: {server.get('requests', 0)} requests, {server.get('rate_limited', 0)} rate limited, "
+              f"{server.get('errors', 0)} failed")
+    if result.get("tokens"):
+        print("tokens: " + ", ".join(f"{model} {kinds}" for model, kinds in result["tokens"].items()))
+    if result.get("stages"):
+        print(f"\n{'stage':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+        for stage in result["stages"]:
+            label = stage["stage"] + "".join(f" {k}={v}" for k, v in stage.items()
+                                             if k not in ("stage", "count", "errors", "mean_ms", "p50_ms", "p95_ms"))
+            print(f"{label:<28}{stage['count']:7d}{stage['p50_ms']:10.1f}{stage['p95_ms']:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--rounds", type=int, default=3, help="flows per session")
+    parser.add_argument("--questions", type=int, default=3, help="chat questions per round")
+    parser.add_argument("--size", choices=corpus.SIZES, default="small")
+    parser.add_argument("--voice", action="store_true", help="also synthesize each reply and transcribe a recording")
+    parser.add_argument("--no-stream", action="store_true", help="use the non-streaming chat path")
+    parser.add_argument("--base-url", help="use an already running mock server instead of starting one")
+    parser.add_argument("--json", type=Path, help="save the results here")
+    parser.add_argument("--compare", type=Path, help="results saved by an earlier --json run")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    corpus.build(args.size)  # before the working directory changes
+    server, base_url = (None, args.base_url) if args.base_url else start_mock(args)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    workdir = tempfile.TemporaryDirectory(prefix="valleyhelps-bench-")
+    os.chdir(workdir.name)  # cache/ paths resolve here, so every run starts cold
+    try:
+        from valleyhelps.metrics import metrics
+
+        recorder = Recorder()
+        workload = prepare(args, recorder)
+        baseline_rss = peak_rss_mb()
+        print(f"{args.sessions} sessions x {args.rounds} rounds, {args.size} corpus "
+              f"({len(workload['resumes'])} resumes, {len(workload['events'])} events)")
+        threads = [
+            threading.Thread(target=run_session, args=(n, args, workload, recorder), name=f"session-{n}")
+            for n in range(args.sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result = summarize(recorder, time.perf_counter() - start, args.sessions * args.rounds)
+        snapshot = metrics.snapshot()
+        result.update({
+            "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "peak_rss_mb": peak_rss_mb(),
+            "baseline_rss_mb": baseline_rss,
+            "server": mock_stats(base_url),
+            "tokens": snapshot["tokens"],
+            "stages": snapshot["stages"],
+        })
+    finally:
+        os.chdir(ROOT)
+        workdir.cleanup()
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(result, previous)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+        print(f"\nsaved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
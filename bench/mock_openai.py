@@ -0,0 +1,231 @@
+"""Local stand-in for the OpenAI endpoints the app uses.
+
+    python -m bench.mock_openai --port 8765 --latency 0.4 --token-interval 0.02 --rpm 600
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock streamlit run combined-hr-assistant-full.py
+
+Serves chat completions (plain, streamed and JSON mode for event scoring),
+speech, transcriptions and embeddings with deterministic bodies. Every
+response waits `--latency` seconds (plus up to `--jitter` of that, at
+random) before its first byte, and streamed replies emit one word every
+`--token-interval` seconds. `--rpm` and `--tpm` enforce a one-minute sliding
+window that answers 429 with retry-after-ms and reports the usual
+x-ratelimit-* headers. `--error-rate` fails that fraction of requests with
+a 503.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from valleyhelps.core import CAREER_MATCH_SYSTEM, GROWTH_PLAN_SYSTEM
+
+REPLY = (
+    "Vacation accrues at ten hours per month for the first five years of service. "
+    "Overtime is paid at one and one-half times the regular rate for hours over forty. "
+    "Sick leave can be used for your own illness or to care for a family member. "
+    "Let me know if you would like the relevant section of the MOU."
+)
+MATCH_ANALYSIS = (
+    "The candidate meets most of the core requirements, including project management and GIS. "
+    "Gaps: no professional engineer license and limited SCADA exposure. "
+    "Recommended next steps: pursue the PE exam and a SCADA fundamentals course."
+)
+EMBEDDING_DIM = 64
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413  # MPEG-1 layer III, 128 kbps, 44.1 kHz: 26 ms
+EVENT_ID = re.compile(r"^\[(\d+)\]", re.MULTILINE)
+# keyed on the system prompt: chat prompts mention resumes too
+CAREER_SYSTEMS = {CAREER_MATCH_SYSTEM, GROWTH_PLAN_SYSTEM}
+
+
+def count_tokens(text):
+    return max(1, math.ceil(len(text) / 4))
+
+
+class RateLimit:
+    """One-minute sliding window over requests and tokens; 0 means unlimited."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = deque()  # (time, tokens)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Headers for an accepted request, or (None, seconds to wait) when over the limit."""
+        now = time.monotonic()
+        with self._lock:
+            while self._requests and now - self._requests[0][0] >= 60:
+                self._requests.popleft()
+            used = sum(t for _, t in self._requests)
+            if (self.rpm and len(self._requests) >= self.rpm) or (self.tpm and used + tokens > self.tpm):
+                return None, 60 - (now - self._requests[0][0])
+            self._requests.append((now, tokens))
+            return self._headers(len(self._requests), used + tokens), 0
+
+    def _headers(self, requests, tokens):
+        headers = {}
+        if self.rpm:
+            headers["x-ratelimit-limit-requests"] = str(self.rpm)
+            headers["x-ratelimit-remaining-requests"] = str(max(0, self.rpm - requests))
+        if self.tpm:
+            headers["x-ratelimit-limit-tokens"] = str(self.tpm)
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, self.tpm - tokens))
+        return headers
+
+
+def _error(status, message, code, headers=None):
+    return JSONResponse({"error": {"message": message, "type": code, "code": code}}, status_code=status, headers=headers)
+
+
+def _prompt_text(messages):
+    return "\n".join(m["content"] for m in messages if isinstance(m.get("content"), str))
+
+
+def _embedding(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    vector = [b - 127.5 for b in (digest * (EMBEDDING_DIM // len(digest) + 1))[:EMBEDDING_DIM]]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector]
+
+
+def create_app(latency=0.0, jitter=0.0, token_interval=0.0, rpm=0, tpm=0, error_rate=0.0, seed=0):
+    limit = RateLimit(rpm, tpm)
+    rng = random.Random(seed)
+    stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    async def admit(tokens):
+        """(headers, None) when the request proceeds, else (None, error response)."""
+        stats["requests"] += 1
+        headers, wait = limit.acquire(tokens)
+        if headers is None:
+            stats["rate_limited"] += 1
+            return None, _error(429, "Rate limit reached", "rate_limit_exceeded", {"retry-after-ms": str(int(wait * 1000))})
+        await asyncio.sleep(latency * (1 + jitter * rng.random()))
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return None, _error(503, "The server is overloaded", "server_error")
+        return headers, None
+
+    async def chat(request):
+        body = await request.json()
+        prompt = _prompt_text(body.get("messages", []))
+        headers, error = await admit(count_tokens(prompt) + body.get("max_tokens", 256))
+        if error:
+            return error
+        if body.get("response_format", {}).get("type") == "json_object":
+            # every third listed event is "relevant", so scoring returns a stable subset
+            text = json.dumps({"relevant_ids": [int(i) for i in EVENT_ID.findall(prompt)][::3]})
+        elif any(m.get("role") == "system" and m.get("content") in CAREER_SYSTEMS for m in body.get("messages", [])):
+            text = MATCH_ANALYSIS
+        else:
+            text = REPLY
+        usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = body.get("model", "gpt-4o-mini")
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers=headers)
+
+        def chunk(delta, finish=None, **extra):
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish}] if delta is not None else []
+            payload = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": choices, **extra}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for word in re.findall(r"\S+\s*", text):
+                await asyncio.sleep(token_interval)
+                yield chunk({"content": word})
+            yield chunk({}, "stop")
+            if body.get("stream_options", {}).get("include_usage"):
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    async def speech(request):
+        body = await request.json()
+        text = body.get("input", "")
+        headers, error = await admit(count_tokens(text))
+        if error:
+            return error
+        seconds = max(0.5, len(text.split()) / 2.5)  # about 150 words a minute
+        return Response(MP3_FRAME * int(seconds / 0.026), media_type="audio/mpeg", headers=headers)
+
+    async def transcriptions(request):
+        form = await request.form()
+        audio = await form["file"].read()
+        headers, error = await admit(1)
+        if error:
+            return error
+        return JSONResponse({"text": f"What is the vacation policy? ({len(audio)} bytes of audio)"}, headers=headers)
+
+    async def embeddings(request):
+        body = await request.json()
+        inputs = [body["input"]] if isinstance(body["input"], str) else body["input"]
+        tokens = sum(count_tokens(text) for text in inputs)
+        headers, error = await admit(tokens)
+        if error:
+            return error
+        return JSONResponse({
+            "object": "list", "model": body.get("model", "text-embedding-3-small"),
+            "data": [{"object": "embedding", "index": i, "embedding": _embedding(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }, headers=headers)
+
+    async def health(request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat, methods=["POST"]),
+        Route("/v1/audio/speech", speech, methods=["POST"]),
+        Route("/v1/audio/transcriptions", transcriptions, methods=["POST"]),
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ])
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before each response starts")
+    parser.add_argument("--jitter", type=float, default=0.5, help="up to this fraction of --latency is added at random")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0: unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute before 429s (0: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with a 503")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def server_options(args):
+    return {
+        "latency": args.latency, "jitter": args.jitter, "token_interval": args.token_interval,
+        "rpm": args.rpm, "tpm": args.tpm, "error_rate": args.error_rate, "seed": args.seed,
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(**server_options(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
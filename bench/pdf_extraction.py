@@ -0,0 +1,67 @@
+"""Compare the legacy page loop against the streaming extraction engine.
+
+    python -m bench.pdf_extraction                 # synthetic 400-page document
+    python -m bench.pdf_extraction path/to/mou.pdf --workers 4
+"""
+import argparse
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from valleyhelps import pdf
+
+PARAGRAPH = (
+    "Section {n}. Employees covered by this Memorandum of Understanding shall accrue vacation, "
+    "sick leave and administrative leave at the rates set out below. Overtime is compensated at "
+    "one and one-half times the regular rate of pay for all hours worked in excess of forty. "
+)
+
+
+def synthetic_pdf(pages):
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (54, 54, -54, -54), PARAGRAPH.format(n=n) * 12, fontsize=9)
+    return doc.tobytes()
+
+
+def legacy_extract(data):
+    document = fitz.open(stream=data, filetype="pdf")
+    file_text = ""
+    for i in range(len(document)):
+        file_text += document.load_page(i).get_text("text")
+    return file_text
+
+
+def timed(label, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {best * 1000:9.1f} ms")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="PDF to extract (default: synthetic document)")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=pdf.PDF_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = open(args.path, "rb").read() if args.path else synthetic_pdf(args.pages)
+    print(f"{pdf.page_count(data)} pages, {len(data) / 1024:.0f} KB, {os.cpu_count()} CPUs, {args.workers} workers")
+
+    legacy, base = timed("legacy page loop", lambda: legacy_extract(data), args.repeat)
+    serial, _ = timed("engine, serial", lambda: "".join(pdf.iter_pdf_pages(data, workers=1)), args.repeat)
+    list(pdf.iter_pdf_pages(data, workers=args.workers))  # warm up the process pool
+    parallel, best = timed("engine, parallel", lambda: "".join(pdf.iter_pdf_pages(data, workers=args.workers)), args.repeat)
+    assert legacy == serial == parallel
+    print(f"speedup vs legacy: {base / best:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
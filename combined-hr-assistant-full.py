@@ -1,16 +1,23 @@
 import streamlit as st
-import pandas as pd
-import openai
-import requests
-import PyPDF2
-import io
 import os
+import io
 import json
-import speech_recognition as sr
+import uuid
+import time
 from datetime import datetime
-import base64
 from pathlib import Path
-import fitz  # PyMuPDF
+from valleyhelps import batch, core
+from valleyhelps.audio import audio_store
+from valleyhelps.cache import content_hash
+from valleyhelps.events import build_event_index
+from valleyhelps.ingest import KB_ARTIFACT, load_artifact
+from valleyhelps.kb_store import DEFAULT_KB_URL, kb_store
+from valleyhelps.metrics import metrics, report_error, serve, span
+from valleyhelps.pdf import cached_pdf_text, cached_pdf_texts
+from valleyhelps.retrieval import KB_USE_EMBEDDINGS
+from valleyhelps.scheduler import scheduler
+from valleyhelps.skills import prescore
+from valleyhelps.speech import SpeechPipeline, mp3_duration, openai_synthesizer, tts_cache, tts_key
 
 # ─── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -21,172 +28,59 @@ st.set_page_config(
 )
 
 # ─── Custom CSS with Accessibility Improvements ───────────────────────────────
-st.markdown("""
-<style>
-    /* General Styling */
-    .main {
-        background-color: #f9f9f9;
-        font-family: 'Arial', sans-serif;
-    }
-    .stSidebar {
-        background-color: #f0f2f6;
-    }
-
-    /* Accessibility: High contrast and focus styles */
-    button, a, input, select, textarea {
-        outline: 2px solid transparent !important;
-        transition: outline 0.2s ease;
-    }
-    button:focus, a:focus, input:focus, select:focus, textarea:focus {
-        outline: 2px solid #0068c9 !important;
-    }
-
-    /* Chat Message Styling */
-    .user-bubble {
-        background-color: #e6f7ff;
-        border-radius: 15px;
-        padding: 12px 15px;
-        margin-bottom: 10px;
-        border-left: 4px solid #0068c9;
-        box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
-    }
-    .assistant-bubble {
-        background-color: #f0f7ff;
-        border-radius: 15px;
-        padding: 12px 15px;
-        margin-bottom: 10px;
-        border-left: 4px solid #4CAF50;
-        box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
-    }
-
-    /* Voice Button Styling */
-    button[title="Click to speak"] {
-        border-radius: 50%;
-        height: 100px; 
-        width: 100px; 
-        font-size: 36px;
-        background-color: #0068c9;
-        color: white;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-        transition: all 0.3s ease;
-    }
-    button[title="Click to speak"]:hover {
-        background-color: #005bb5;
-        box-shadow: 0 6px 12px rgba(0,0,0,0.3);
-        transform: translateY(-2px);
-    }
-
-    /* Header Styling */
-    .header-container {
-        display: flex;
-        align-items: center;
-        background-color: #f0f7ff;
-        padding: 10px 20px;
-        border-radius: 10px;
-        margin-bottom: 20px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-    }
-
-    /* KB Status Indicator */
-    .kb-status {
-        display: inline-block;
-        padding: 5px 10px;
-        border-radius: 15px;
-        font-size: 0.8rem;
-        margin-right: 10px;
-    }
-    .kb-active {
-        background-color: #d4edda;
-        color: #155724;
-    }
-    .kb-inactive {
-        background-color: #f8d7da;
-        color: #721c24;
-    }
-
-    /* Footer Styling */
-    .footer {
-        text-align: center;
-        padding: 10px;
-        color: #6c757d;
-        border-top: 1px solid #dee2e6;
-        margin-top: 20px;
-    }
-
-    /* File Uploader */
-    .uploadedFile {
-        border: 1px solid #ddd;
-        border-radius: 5px;
-        padding: 5px;
-    }
-
-    /* Chat Input */
-    .stTextInput input {
-        border-radius: 20px;
-        padding: 10px 15px;
-        border: 1px solid #ced4da;
-    }
-
-    /* Career Plan Styling */
-    .match-analysis {
-        background-color: #f0f7ff;
-        border-radius: 10px;
-        padding: 15px;
-        border-left: 4px solid #5bc0de;
-        margin-bottom: 15px;
-    }
-
-    .event-card {
-        background-color: white;
-        border-radius: 8px;
-        padding: 15px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        margin-bottom: 10px;
-        border-left: 3px solid #0068c9;
-    }
-
-    /* Responsive Design */
-    @media (max-width: 768px) {
-        .header-container {
-            flex-direction: column;
-            align-items: flex-start;
-        }
-        .header-title {
-            margin-left: 0;
-            margin-top: 10px;
-        }
-        button[title="Click to speak"] {
-            height: 80px;
-            width: 80px;
-            font-size: 30px;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def page_css():
+    return f"<style>\n{(Path(__file__).parent / 'styles.css').read_text()}</style>"
+
+st.markdown(page_css(), unsafe_allow_html=True)
 
 # Initialize OpenAI client
 def get_openai_client():
-    return openai.OpenAI(api_key=st.session_state.openai_api_key)
+    return core.openai_client(st.session_state.openai_api_key)
 
 # ─── Load API Key ───────────────────────────────────────────────────────────────
 openai_api_key = os.getenv("OPENAI_API_KEY", "")
 st.session_state.openai_api_key = openai_api_key
+STREAM_CHAT = os.getenv("VALLEYHELPS_STREAM_CHAT", "1") != "0"
+CHAT_WINDOW = int(os.getenv("VALLEYHELPS_CHAT_WINDOW", "20"))  # messages rendered before "Show earlier"
+
+# ─── Shared Knowledge Base ─────────────────────────────────────────────────────
+@st.cache_resource(show_spinner="Loading default knowledge base...")
+def _default_kb_docs():
+    if KB_ARTIFACT:
+        return dict(load_artifact(KB_ARTIFACT))
+    return {DEFAULT_KB_URL.split("/")[-1]: kb_store.load_url(DEFAULT_KB_URL)}
+
+def load_default_kb():
+    """Name -> doc id of the prebuilt KB artifact, else of the default KB URL."""
+    if not KB_ARTIFACT and not DEFAULT_KB_URL:
+        return {}
+    try:
+        return dict(_default_kb_docs())
+    except Exception as e:
+        # not cached, so the next session retries
+        report_error("default_kb", e)
+        return {}
 
 # ─── Session State Defaults ────────────────────────────────────────────────────
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
-if "knowledge_base" not in st.session_state:
-    st.session_state.knowledge_base = ""
+if "chat_summary" not in st.session_state:
+    # running summary of the turns that no longer fit the history budget
+    st.session_state.chat_summary = {}
+if "chat_window" not in st.session_state:
+    st.session_state.chat_window = CHAT_WINDOW
+if "kb_index" not in st.session_state:
+    st.session_state.kb_index = None
 if "audio_mode" not in st.session_state:
     st.session_state.audio_mode = False
-if "kb_text_1" not in st.session_state:
-    st.session_state.kb_text_1 = ""
-if "kb_text_2" not in st.session_state:
-    st.session_state.kb_text_2 = ""
 if "theme" not in st.session_state:
     st.session_state.theme = "light"
-if "kb_names" not in st.session_state:
-    st.session_state.kb_names = ["", ""]
+if "kb_docs" not in st.session_state:
+    # document name -> id in the shared store; the default KB is loaded once per process
+    st.session_state.kb_docs = load_default_kb()
 if "audio_path" not in st.session_state:
     st.session_state.audio_path = None
 if "last_response" not in st.session_state:
@@ -197,75 +91,156 @@ if "career_goal" not in st.session_state:
     st.session_state.career_goal = None
 if "events_data" not in st.session_state:
     st.session_state.events_data = None
+if "events_hash" not in st.session_state:
+    st.session_state.events_hash = None
+if "career_resources" not in st.session_state:
+    st.session_state.career_resources = []
+if "events_index" not in st.session_state:
+    st.session_state.events_index = None
+if "batch_results" not in st.session_state:
+    st.session_state.batch_results = None
 
 # ─── PDF Helpers ────────────────────────────────────────────────────────────────
 def extract_text_from_pdf(uploaded_file):
     try:
-        pdf = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-        file_text = ""
-        for i in range(len(pdf)):
-            page = pdf.load_page(i)
-            file_text += page.get_text("text")
-        return file_text
+        return cached_pdf_text(uploaded_file.getvalue())
     except Exception as e:
-        try:
-            uploaded_file.seek(0)
-            reader = PyPDF2.PdfReader(uploaded_file)
-            return "\n".join(page.extract_text() or "" for page in reader.pages)
-        except Exception as e2:
-            st.error(f"Error extracting text from PDF: {e2}")
-            return None
+        report_error("extract", e, file=getattr(uploaded_file, "name", "<download>"))  # downloads are BytesIO
+        st.error(f"Error extracting text from PDF: {e}")
+        return None
+
+def extract_texts_from_pdfs(uploaded_files):
+    texts = []
+    results = cached_pdf_texts([f.getvalue() for f in uploaded_files])
+    for f, result in zip(uploaded_files, results):
+        if isinstance(result, Exception):
+            report_error("extract", result, file=f.name)
+            st.error(f"Error extracting text from {f.name}: {result}")
+            result = None
+        texts.append(result)
+    return texts
 
 def download_pdf_from_url(url):
     try:
-        r = requests.get(url)
-        if r.status_code == 200:
-            return io.BytesIO(r.content)
-        return None
+        return core.download_pdf(url)
     except Exception as e:
+        report_error("download", e, url=url)
         st.error(f"Error downloading PDF: {e}")
         return None
 
+# ─── Knowledge Base Retrieval ───────────────────────────────────────────────────
+def get_kb_index(doc_ids):
+    if not doc_ids:
+        return None
+    if KB_USE_EMBEDDINGS and st.session_state.openai_api_key:
+        try:
+            return kb_store.index(doc_ids, embed=core.embedder(get_openai_client()))
+        except Exception as e:
+            st.warning(f"Embedding index unavailable, using keyword search only: {e}")
+    return kb_store.index(doc_ids)
+
 # ─── OpenAI Chat & TTS ──────────────────────────────────────────────────────────
 def query_openai(prompt, history, model="gpt-4o-mini", sys_prompt=None):
     try:
-        client = get_openai_client()
-        if sys_prompt is None:
-            sys = "You are ValleyHelps, an HR assistant chatbot for Valley Water. Be helpful, friendly, and concise. When someone brings up a job or resume, inform them of the career planning tool. If the topic is workshops or events, bring up the events exploration tool."
-            if st.session_state.knowledge_base:
-                sys += "\n\nKnowledge Base:\n" + st.session_state.knowledge_base
-        else:
-            sys = sys_prompt
-
-        msgs = [{"role":"system","content":sys}]
-        for e in history:
-            msgs.append({"role":e["role"], "content":e["content"]})
-        msgs.append({"role":"user","content":prompt})
-
         with st.spinner("ValleyHelps is thinking..."):
-            resp = client.chat.completions.create(
-                model=model, messages=msgs, max_tokens=500, temperature=0.7
+            return core.chat(
+                get_openai_client(), prompt, history, st.session_state.kb_index, model, sys_prompt,
+                st.session_state.chat_summary,
             )
-        return resp.choices[0].message.content
     except Exception as e:
         return f"Error: {e}"
 
-def text_to_speech(text):
+def stream_openai(prompt, history, model="gpt-4o-mini", sys_prompt=None):
     try:
-        client = get_openai_client()
-        with st.spinner("Converting to speech..."):
-            audio = client.audio.speech.create(model="tts-1", voice="sage", input=text)
-        os.makedirs("cache", exist_ok=True)
-        audio_path = f"cache/response_{datetime.now().strftime('%Y%m%d%H%M%S')}.mp3"
-        with open(audio_path, "wb") as f:
-            f.write(audio.content)
-        return audio_path
+        chunks = core.stream_chat(
+            get_openai_client(), prompt, history, st.session_state.kb_index, model, sys_prompt,
+            st.session_state.chat_summary,
+        )
+        with st.spinner("ValleyHelps is thinking..."):
+            first = next(chunks, "")
+        yield first
+        yield from chunks
+    except Exception as e:
+        yield f"Error: {e}"
+
+def render_streamed_reply(placeholder, chunks, min_interval=0.05):
+    # redraw at most every min_interval seconds so long replies don't flood the websocket
+    parts, last_draw, drawing = [], 0.0, 0.0
+    for chunk in chunks:
+        parts.append(chunk)
+        if time.monotonic() - last_draw >= min_interval:
+            start = time.perf_counter()
+            placeholder.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{''.join(parts)}▌</div>", unsafe_allow_html=True)
+            drawing += time.perf_counter() - start
+            last_draw = time.monotonic()
+    text = "".join(parts)
+    start = time.perf_counter()
+    placeholder.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{text}</div>", unsafe_allow_html=True)
+    # only the redraws, not the time spent waiting for the model
+    metrics.observe(drawing + time.perf_counter() - start, stage="render", area="reply")
+    return text
+
+def show_earlier_messages():
+    st.session_state.chat_window += CHAT_WINDOW
+
+def collapse_chat_history():
+    st.session_state.chat_window = CHAT_WINDOW
+
+def render_chat_history(history):
+    # only the latest messages are drawn, so a rerun costs the same however long the chat is
+    start = max(0, len(history) - st.session_state.chat_window)
+    if start:
+        earlier_col, _ = st.columns([2, 3])
+        with earlier_col:
+            st.button(f"⬆️ Show earlier messages ({start} hidden)", on_click=show_earlier_messages, key="chat_show_earlier")
+    elif st.session_state.chat_window > CHAT_WINDOW and len(history) > CHAT_WINDOW:
+        st.button("⬇️ Collapse earlier messages", on_click=collapse_chat_history, key="chat_collapse")
+    for msg in history[start:]:
+        if msg["role"] == "user":
+            st.markdown(f"<div class='user-bubble'><strong>You:</strong><br>{msg['content']}</div>", unsafe_allow_html=True)
+        else:
+            st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{msg['content']}</div>", unsafe_allow_html=True)
+
+def play_next_clip(pipeline, player, playback):
+    # start the next sentence only once it is synthesized and the previous one has finished
+    i = playback["next"]
+    if i >= len(pipeline.clips) or not pipeline.clips[i].done() or time.monotonic() < playback["ends_at"]:
+        return False
+    playback["next"] += 1
+    try:
+        clip = pipeline.clips[i].result()
     except Exception as e:
+        report_error("tts", e)
         st.error(f"TTS Error: {e}")
+        return True
+    player.audio(clip, format="audio/mp3", autoplay=True)
+    playback["ends_at"] = time.monotonic() + mp3_duration(clip) + 0.25
+    return True
+
+def speak_while_streaming(chunks, pipeline, player):
+    playback = {"next": 0, "ends_at": 0.0}
+    for chunk in chunks:
+        pipeline.feed(chunk)
+        play_next_clip(pipeline, player, playback)
+        yield chunk
+    pipeline.close()
+    while playback["next"] < len(pipeline.clips):
+        if not play_next_clip(pipeline, player, playback):
+            time.sleep(0.05)
+
+def save_reply_audio(pipeline, text):
+    # MP3 frames concatenate cleanly, so the sentence clips make one replayable file.
+    # Cached audio is replayed for every repeat of the answer, so a reply with a
+    # failed sentence is only heard live, never stored.
+    if not pipeline.clips or any(c.exception() for c in pipeline.clips):
         return None
+    clips = [c.result() for c in pipeline.clips]
+    return str(tts_cache.set(tts_key(text), b"".join(clips)))
 
 # ─── Voice Recording ────────────────────────────────────────────────────────────
 def record_audio():
+    import speech_recognition as sr
+
     try:
         r = sr.Recognizer()
         mic = sr.Microphone()
@@ -274,201 +249,187 @@ def record_audio():
             r.pause_threshold = 1.0
             with st.spinner("🎙️ Listening..."):
                 audio = r.listen(src, timeout=5, phrase_time_limit=15)
-        os.makedirs("cache", exist_ok=True)
-        audio_path = f"cache/recording_{datetime.now().strftime('%Y%m%d%H%M%S')}.wav"
+        audio_path = audio_store.new_path(st.session_state.session_id, "recording", ".wav")
         with open(audio_path, "wb") as f:
             f.write(audio.get_wav_data())
-        return audio_path
+        return str(audio_path)
     except Exception as e:
+        report_error("recording", e)
         st.error(f"Recording Error: {e}")
         return None
 
 def speech_to_text(path):
     try:
         client = get_openai_client()
-        with open(path, "rb") as f:
-            with st.spinner("Transcribing your message..."):
-                t = client.audio.transcriptions.create(model="whisper-1", file=f)
+        with st.spinner("Transcribing your message..."):
+            # bytes rather than an open file, so a retried request re-sends the audio
+            t = scheduler.call(
+                "transcriptions", client.audio.transcriptions.with_raw_response.create,
+                model="whisper-1", file=(Path(path).name, Path(path).read_bytes()),
+            )
         return t.text
     except Exception as e:
+        report_error("transcribe", e)
         st.error(f"Whisper Error: {e}")
         return ""
 
-def get_base64_audio(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-        return base64.b64encode(data).decode()
-
-def get_html_player(file_path):
-    audio_base64 = get_base64_audio(file_path)
-    return f"""
-    <audio controls>
-        <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-        Your browser does not support the audio element.
-    </audio>
-    """
-
 # ─── Cache Management ───────────────────────────────────────────────────────────
-Path("cache").mkdir(exist_ok=True)
+@st.cache_resource
+def init_caches():
+    # once per process, not on every rerun
+    Path("cache").mkdir(exist_ok=True)
+    audio_store.start()
+    serve()  # Prometheus /metrics on VALLEYHELPS_METRICS_PORT, when set
 
-def cleanup_cache(current_audio_path=None):
-    try:
-        audio_files = list(Path("cache").glob("*.mp3")) + list(Path("cache").glob("*.wav"))
-        for f in audio_files:
-            if current_audio_path and f.samefile(current_audio_path):
-                continue
-            f.unlink()
-    except Exception as e:
-        print(f"Error cleaning cache: {e}")
+init_caches()
 
 # ─── Career Planning Functions ───────────────────────────────────────────────────
-def analyze_event_relevance(events, match_analysis, career_goal):
-    relevant_events = []
-    for _, event in events.iterrows():
-        prompt = f"""
-        The user has the following career goal: "{career_goal}". Based on the following match analysis:
-        "{match_analysis}", assess if the following event would help the user achieve their goal:
-
-        Event Details:
-        Name: {event['Event Name']}
-        Description: {event['Description']}
-
-        Respond with "Yes" if the event is relevant, and "No" if it is not.
-        """
-        completion = get_openai_client().chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an intelligent career planner."},
-                {"role": "user", "content": prompt},
-            ]
+def uploaded_documents(uploaded_files):
+    # zips are expanded so a whole folder of resumes can be uploaded at once
+    documents = []
+    for f in uploaded_files:
+        if f.name.lower().endswith(".zip"):
+            documents.extend((f"{f.name}/{name}", data) for name, data in batch.documents_from_zip(f.getvalue()))
+        else:
+            documents.append((f.name, f.getvalue()))
+    return documents
+
+def batch_table(results):
+    import pandas as pd
+
+    df = pd.DataFrame(results, columns=batch.CSV_FIELDS)
+    return df.sort_values("score", ascending=False, na_position="last").rename(columns=str.title)
+
+def run_batch_match(resume_files, job_files):
+    with st.spinner("Extracting text from documents..."):
+        resumes = batch.extract_documents(uploaded_documents(resume_files))
+        jobs = batch.extract_documents(uploaded_documents(job_files))
+    total = len(resumes) * len(jobs)
+    progress = st.progress(0.0, text=f"Matching {len(resumes)} resumes against {len(jobs)} job descriptions...")
+    table = st.empty()
+    # local pre-scores fill the table straight away; model results replace rows as they land
+    comparisons = batch.prescore_pairs(resumes, jobs)
+    rows = {r["pair"]: r for r in batch.pending_results(resumes, jobs, comparisons)}
+    table.dataframe(batch_table(list(rows.values())), use_container_width=True, hide_index=True)
+    done, start = 0, time.perf_counter()
+    for result in batch.iter_matches(get_openai_client(), resumes, jobs, comparisons=comparisons):
+        rows[result["pair"]] = result
+        done += 1
+        progress.progress(done / total, text=f"{done} of {total} matches complete")
+        table.dataframe(batch_table(list(rows.values())), use_container_width=True, hide_index=True)
+    results = list(rows.values())
+    rate = batch.resumes_per_minute(sum(not r["error"] for r in results), len(jobs), time.perf_counter() - start)
+    st.session_state.batch_results = {"results": results, "rate": rate}
+
+def event_rows(events):
+    return [
+        (i, event["Event Name"], event["Description"])
+        for i, (_, event) in enumerate(events.iterrows())
+    ]
+
+def analyze_event_relevance(events, match_analysis, career_goal, index=None):
+    try:
+        relevant_ids, error = core.recommend_events(
+            st.session_state.openai_api_key, event_rows(events), match_analysis, career_goal, index
         )
-        response = completion.choices[0].message.content.strip()
-        if response.lower() == "yes":
-            relevant_events.append(event)
-    return relevant_events
-
-# ─── Sidebar with Improved Organization ─────────────────────────────────────────
-with st.sidebar:
-    
-    st.markdown("<h2 style='margin-top:-5px'></h2>", unsafe_allow_html=True)
-
-    if not openai_api_key:
-        st.error("⚠️ Please set the OPENAI_API_KEY environment variable.")
-    else:
-        st.success("✅ API Key loaded")
-
-    st.divider()
-
-    # Settings Section
-    with st.expander("⚙️ Settings", expanded=True):
-        # Theme Toggle
-        theme_label, theme_toggle = st.columns([3, 1])
-        with theme_label:
-            st.markdown("#### Theme")
-        with theme_toggle:
-            if st.button("🌙" if st.session_state.theme == "light" else "☀️", key="theme_toggle"):
-                st.session_state.theme = "dark" if st.session_state.theme == "light" else "light"
-                st.rerun()
-
-        # Voice Mode Toggle
-        voice_label, voice_toggle = st.columns([3, 1])
-        with voice_label:
-            st.markdown("#### Voice Interaction")
-        with voice_toggle:
-            voice_enabled = st.toggle("", st.session_state.audio_mode, key="voice_toggle")
-            if voice_enabled != st.session_state.audio_mode:
-                st.session_state.audio_mode = voice_enabled
-                st.rerun()
-
-        if st.session_state.audio_mode:
-            st.info("💡 Click the microphone button below the chat to speak your questions.")
-
-    st.divider()
-
-    # Knowledge Base Management
+    except Exception as e:
+        report_error("events", e)
+        st.error(f"Error scoring events: {e}")
+        return []
+    if error:
+        st.warning(f"⚠️ AI event scoring unavailable ({error}). Showing the closest keyword matches instead.")
+    return [events.iloc[i] for i in relevant_ids]
+
+# ─── Fragments ──────────────────────────────────────────────────────────────────
+# Each area is an st.fragment: a click inside one reruns just that area, not the
+# whole script with every chat bubble and tab. Changes other areas depend on
+# (KB documents, events data, career resources and goal, imported chat history)
+# end with a full st.rerun() instead.
+def toggle_theme():
+    st.session_state.theme = "dark" if st.session_state.theme == "light" else "light"
+
+@st.fragment
+def theme_button():
+    # the callback runs before the fragment re-renders, so the icon is already current
+    st.button("🌙" if st.session_state.theme == "light" else "☀️", key="theme_toggle", on_click=toggle_theme)
+
+@st.fragment
+def kb_manager():
     with st.expander("📚 Knowledge Base", expanded=True):
-        kb_tabs = st.tabs(["KB 1", "KB 2"])
-        for i, tab in enumerate(kb_tabs):
-            with tab:
-                if i == 0:
-                    kb_option_key = "kb1_option"
-                    pdf_url_key = "pdf_url_1"
-                    load_url_key = "load_url_1"
-                    file_uploader_key = "ups1"
-                    proc_key = "proc1"
-                    kb_text = st.session_state.kb_text_1
-                else:
-                    kb_option_key = "kb2_option"
-                    pdf_url_key = "pdf_url_2"
-                    load_url_key = "load_url_2"
-                    file_uploader_key = "ups2"
-                    proc_key = "proc2"
-                    kb_text = st.session_state.kb_text_2
-
-                kb_option = st.radio(
-                    "Input method:",
-                    ["URL", "File Upload", "None"],
-                    key=kb_option_key,
-                    horizontal=True
-                )
+        # shown once, after the full rerun that picked up the new documents
+        if st.session_state.get("kb_notice"):
+            st.success(st.session_state.pop("kb_notice"))
+        kb_option = st.radio(
+            "Add documents:",
+            ["URL", "File Upload"],
+            key="kb_option",
+            horizontal=True
+        )
 
-                if kb_option == "URL":
-                    pdf_url = st.text_input(
-                        "PDF URL",
-                        value="" if i > 0 else "https://s3.us-west-1.amazonaws.com/valleywater.org.us-west-1/s3fs-public/Employees%20Association%20MOU%202022-2025.docx%20%283%29.pdf",
-                        key=pdf_url_key,
-                        placeholder="Enter URL to PDF document"
-                    )
-                    if st.button("📥 Load PDF", key=load_url_key) and pdf_url:
-                        with st.spinner("Downloading PDF..."):
-                            f = download_pdf_from_url(pdf_url)
-                        if f:
-                            with st.spinner("Extracting text..."):
-                                if i == 0:
-                                    st.session_state.kb_text_1 = extract_text_from_pdf(f)
-                                    st.session_state.kb_names[0] = pdf_url.split("/")[-1]
-                                else:
-                                    st.session_state.kb_text_2 = extract_text_from_pdf(f)
-                                    st.session_state.kb_names[1] = pdf_url.split("/")[-1]
-                                st.success("✅ PDF loaded successfully")
-                        else:
-                            st.error("❌ Failed to fetch PDF")
-                elif kb_option == "File Upload":
-                    uploaded_files = st.file_uploader(
-                        "Upload PDFs (max 3)",
-                        type="pdf",
-                        accept_multiple_files=True,
-                        key=file_uploader_key
-                    )
-                    if uploaded_files:
-                        files = uploaded_files[:3]
-                        for file in files:
-                            st.markdown(f"📄 **{file.name}** ({round(file.size/1024, 1)} KB)")
-                        if st.button("📥 Process Files", key=proc_key):
-                            with st.spinner("Extracting text from PDFs..."):
-                                text = ""
-                                for p in files:
-                                    text += extract_text_from_pdf(p) + "\n\n"
-                                if i == 0:
-                                    st.session_state.kb_text_1 = text
-                                    st.session_state.kb_names[0] = ", ".join([f.name for f in files])
-                                else:
-                                    st.session_state.kb_text_2 = text
-                                    st.session_state.kb_names[1] = ", ".join([f.name for f in files])
-                                st.success(f"✅ {len(files)} file(s) processed successfully")
-
-                if kb_text:
-                    st.info(f"📚 KB {i+1} loaded ({len(kb_text)} chars)")
-                    if st.button(f"❌ Clear KB {i+1}"):
-                        if i == 0:
-                            st.session_state.kb_text_1 = ""
-                            st.session_state.kb_names[0] = ""
+        # each document is indexed on its own; adding one under an existing name replaces it
+        if kb_option == "URL":
+            pdf_url = st.text_input(
+                "PDF URL",
+                key="pdf_url",
+                placeholder="Enter URL to PDF document"
+            )
+            if st.button("📥 Load PDF", key="load_url") and pdf_url:
+                with st.spinner("Downloading PDF..."):
+                    f = download_pdf_from_url(pdf_url)
+                if f:
+                    with st.spinner("Extracting text..."):
+                        name = pdf_url.split("/")[-1]
+                        try:
+                            doc_id = kb_store.put_pdf(f.getvalue(), name)
+                        except Exception as e:
+                            report_error("extract", e, file=name)
+                            st.error(f"Error extracting text from PDF: {e}")
                         else:
-                            st.session_state.kb_text_2 = ""
-                            st.session_state.kb_names[1] = ""
+                            st.session_state.kb_docs[name] = doc_id
+                            st.session_state.kb_notice = "✅ PDF loaded successfully"
+                            st.rerun()
+                else:
+                    st.error("❌ Failed to fetch PDF")
+        elif kb_option == "File Upload":
+            uploaded_files = st.file_uploader(
+                "Upload PDFs",
+                type="pdf",
+                accept_multiple_files=True,
+                key="kb_uploads"
+            )
+            if uploaded_files:
+                for file in uploaded_files:
+                    st.markdown(f"📄 **{file.name}** ({round(file.size/1024, 1)} KB)")
+                if st.button("📥 Process Files", key="kb_process"):
+                    with st.spinner("Extracting text from PDFs..."):
+                        added = 0
+                        for file, text in zip(uploaded_files, extract_texts_from_pdfs(uploaded_files)):
+                            if text:
+                                st.session_state.kb_docs[file.name] = kb_store.put(text, file.name)
+                                added += 1
+                            elif text is not None:
+                                st.warning(f"No extractable text in {file.name}")
+                    # with nothing added, keep the per-file errors on screen instead of rerunning them away
+                    if added:
+                        failed = len(uploaded_files) - added
+                        st.session_state.kb_notice = f"✅ {added} file(s) processed successfully" + (
+                            f" ({failed} could not be read)" if failed else ""
+                        )
                         st.rerun()
 
-    # Admin Section
+        for name, doc_id in list(st.session_state.kb_docs.items()):
+            kb_doc = kb_store.get(doc_id)
+            doc_col, remove_col = st.columns([5, 1])
+            with doc_col:
+                size = f" ({round(kb_doc.size/1024, 1)} KB of text)" if kb_doc else ""
+                st.markdown(f"📚 **{name}**{size}")
+            with remove_col:
+                if st.button("❌", key=f"kb_remove_{name}", help=f"Remove {name}"):
+                    del st.session_state.kb_docs[name]
+                    st.rerun()
+
+@st.fragment
+def admin_section():
     with st.expander("🔒 Admin Section", expanded=False):
         uploaded_resources = st.file_uploader(
             "Upload Career Resources (PDF or Text) Please omit any personal details.",
@@ -482,25 +443,67 @@ with st.sidebar:
                 if resource.type == "application/pdf":
                     resource_texts.append(extract_text_from_pdf(resource))
                 elif resource.type == "text/plain":
-                    resource_texts.append(resource.read().decode("utf-8"))
+                    resource_texts.append(resource.getvalue().decode("utf-8"))
             st.success(f"✅ {len(uploaded_resources)} resource(s) loaded")
+        if resource_texts != st.session_state.career_resources:
+            st.session_state.career_resources = resource_texts
+            st.rerun()
 
         uploaded_events_csv = st.file_uploader("Upload Events Data (CSV)", type=["csv"], key="events_csv")
         if uploaded_events_csv:
-            try:
-                st.session_state.events_data = pd.read_csv(uploaded_events_csv)
-                st.success("✅ Events data uploaded successfully!")
-            except Exception as e:
-                st.error(f"❌ Error reading CSV file: {e}")
+            events_hash = content_hash(uploaded_events_csv.getvalue())
+            if events_hash != st.session_state.events_hash:
+                import pandas as pd
 
-    # Combine KBs
-    st.session_state.knowledge_base = "\n\n".join(
-        txt for txt in (st.session_state.kb_text_1, st.session_state.kb_text_2) if txt
-    )
+                try:
+                    st.session_state.events_data = pd.read_csv(uploaded_events_csv)
+                    st.session_state.events_index = build_event_index(event_rows(st.session_state.events_data))
+                    st.session_state.events_hash = events_hash
+                    st.rerun()
+                except Exception as e:
+                    report_error("events_csv", e)
+                    st.error(f"❌ Error reading CSV file: {e}")
+            if events_hash == st.session_state.events_hash:
+                st.success("✅ Events data uploaded successfully!")
 
-    st.divider()
+def hit_rates(stats, prefix=""):
+    # one row per cache that counts hits and misses, including nested ones such as kb_store's
+    rows = []
+    for name, values in stats.items():
+        if isinstance(values, dict):
+            rows.extend(hit_rates(values, f"{prefix}{name} "))
+        elif name == "hits" and "misses" in stats:
+            lookups = stats["hits"] + stats.get("similar_hits", 0) + stats["misses"]
+            rows.append({
+                "cache": prefix.strip(),
+                "lookups": lookups,
+                "hit rate": f"{(lookups - stats['misses']) / lookups:.0%}" if lookups else "-",
+                "entries": stats.get("entries"),
+                "MB": round(stats["bytes"] / 2**20, 1) if "bytes" in stats else None,
+            })
+    return rows
+
+@st.fragment
+def metrics_dashboard():
+    with st.expander("📊 Performance", expanded=False):
+        # off by default: the tables load pandas, which the app otherwise defers
+        if not st.toggle("Show metrics", key="metrics_visible"):
+            return
+        st.button("🔄 Refresh", key="metrics_refresh")
+        snapshot = metrics.snapshot()
+        st.markdown("#### Stage latency")
+        st.dataframe(snapshot["stages"], use_container_width=True, hide_index=True)
+        st.markdown("#### Tokens")
+        st.dataframe(
+            [{"model": model, **kinds} for model, kinds in snapshot["tokens"].items()],
+            use_container_width=True, hide_index=True,
+        )
+        st.markdown("#### Caches")
+        st.dataframe(hit_rates(snapshot["stats"]), use_container_width=True, hide_index=True)
+        st.caption(f"OpenAI retries: {snapshot['stats'].get('openai', {}).get('retries', 0)}")
 
-    # Chat History Management
+@st.fragment
+def chat_management():
     with st.expander("💾 Chat Management", expanded=False):
         st.markdown("#### Import Chat History")
         chat_json = st.text_area(
@@ -514,13 +517,17 @@ with st.sidebar:
             if st.button("📥 Load History"):
                 try:
                     st.session_state.chat_history = json.loads(chat_json)
-                    st.success("✅ Chat history loaded")
+                    st.session_state.chat_summary = {}
+                    st.session_state.chat_window = CHAT_WINDOW
+                    st.rerun()
                 except:
                     st.error("❌ Invalid JSON format")
 
         with col2:
             if st.button("🗑️ Clear Chat"):
                 st.session_state.chat_history = []
+                st.session_state.chat_summary = {}
+                st.session_state.chat_window = CHAT_WINDOW
                 st.success("🧹 Chat cleared")
                 st.rerun()
 
@@ -534,57 +541,86 @@ with st.sidebar:
                 mime="application/json"
             )
 
-# ─── Main App UI ───────────────────────────────────────────────────────────────
-# Custom Header
-st.image("images/valleyhelpsbannerfinalver1.png", width=800)
-st.markdown("<h1 style='margin-bottom:0'>HR Assistant</h1>", unsafe_allow_html=True)
+# ─── Sidebar with Improved Organization ─────────────────────────────────────────
+with st.sidebar:
+    
+    st.markdown("<h2 style='margin-top:-5px'></h2>", unsafe_allow_html=True)
 
-# Status Indicators
-status_col1, status_col2 = st.columns(2)
-with status_col1:
-    if st.session_state.knowledge_base:
-        kb_names = [name for name in st.session_state.kb_names if name]
-        if kb_names:
-            st.markdown(f"<div class='kb-status kb-active'>📚 Using: {', '.join(kb_names)}</div>", unsafe_allow_html=True)
-        else:
-            st.markdown("<div class='kb-status kb-active'>📚 Knowledge Base Active</div>", unsafe_allow_html=True)
+    if not openai_api_key:
+        st.error("⚠️ Please set the OPENAI_API_KEY environment variable.")
     else:
-        st.markdown("<div class='kb-status kb-inactive'>⚠️ No Knowledge Base</div>", unsafe_allow_html=True)
-with status_col2:
-    if st.session_state.audio_mode:
-        st.markdown("<div class='kb-status kb-active'>🎙️ Voice Mode Active</div>", unsafe_allow_html=True)
+        st.success("✅ API Key loaded")
 
-# Main Tabs
-tab1, tab2, tab3 = st.tabs(["💬 Chat Assistant", "📈 Career Planning", "🎉 Events Exploration"])
+    st.divider()
 
-# Tab 1: Chat Assistant
-with tab1:
+    # Settings Section
+    with st.expander("⚙️ Settings", expanded=True):
+        # Theme Toggle
+        theme_label, theme_toggle = st.columns([3, 1])
+        with theme_label:
+            st.markdown("#### Theme")
+        with theme_toggle:
+            theme_button()
+
+        # Voice Mode Toggle
+        voice_label, voice_toggle = st.columns([3, 1])
+        with voice_label:
+            st.markdown("#### Voice Interaction")
+        with voice_toggle:
+            voice_enabled = st.toggle("", st.session_state.audio_mode, key="voice_toggle")
+            if voice_enabled != st.session_state.audio_mode:
+                st.session_state.audio_mode = voice_enabled
+                st.rerun()
+
+        if st.session_state.audio_mode:
+            st.info("💡 Click the microphone button below the chat to speak your questions.")
+
+    st.divider()
+
+    # Knowledge Base Management
+    kb_manager()
+
+    # Admin Section
+    admin_section()
+    metrics_dashboard()
+
+    # Combine KBs
+    kb_ids = tuple(doc_id for doc_id in st.session_state.kb_docs.values() if kb_store.get(doc_id))
+    with st.spinner("Indexing knowledge base..."):
+        st.session_state.kb_index = get_kb_index(kb_ids)
+
+    st.divider()
+
+    # Chat History Management
+    chat_management()
+
+# ─── Main App UI ───────────────────────────────────────────────────────────────
+@st.fragment
+def chat_tab():
     chat_container = st.container()
     audio_player_container = st.container()
 
-    # Clear previous audio player before displaying a new one
+    # Streamlit serves the file over its media endpoint instead of inlining it in the page
     if st.session_state.audio_path and os.path.exists(st.session_state.audio_path):
         with audio_player_container:
-            audio_player_container.empty()  # Clear previous audio players
-            st.markdown(get_html_player(st.session_state.audio_path), unsafe_allow_html=True)
+            st.audio(st.session_state.audio_path, format="audio/mp3")
 
-    with chat_container:
-        for msg in st.session_state.chat_history:
-            if msg["role"] == "user":
-                st.markdown(f"<div class='user-bubble'><strong>You:</strong><br>{msg['content']}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{msg['content']}</div>", unsafe_allow_html=True)
+    with chat_container, span("render", area="history"):
+        render_chat_history(st.session_state.chat_history)
 
     if not st.session_state.audio_mode:
         user_input = st.chat_input("Ask ValleyHelps anything about HR...", key="text_input")
         if user_input:
             st.markdown(f"<div class='user-bubble'><strong>You:</strong><br>{user_input}</div>", unsafe_allow_html=True)
             st.session_state.chat_history.append({"role":"user","content":user_input})
-            resp = query_openai(user_input, st.session_state.chat_history[:-1])
+            if STREAM_CHAT:
+                resp = render_streamed_reply(st.empty(), stream_openai(user_input, st.session_state.chat_history[:-1]))
+            else:
+                resp = query_openai(user_input, st.session_state.chat_history[:-1])
+                st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{resp}</div>", unsafe_allow_html=True)
             st.session_state.last_response = resp
-            st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{resp}</div>", unsafe_allow_html=True)
+            # both bubbles are already on screen; the history loop picks them up on the next rerun
             st.session_state.chat_history.append({"role":"assistant","content":resp})
-            st.rerun()
     else:
         if not openai_api_key:
             st.warning("⚠️ Voice mode requires OpenAI API key")
@@ -599,24 +635,33 @@ with tab1:
                         if text_input:
                             st.markdown(f"<div class='user-bubble'><strong>You:</strong><br>{text_input}</div>", unsafe_allow_html=True)
                             st.session_state.chat_history.append({"role":"user","content":text_input})
-                            resp = query_openai(text_input, st.session_state.chat_history[:-1])
+                            cached = core.cached_answer(text_input, st.session_state.chat_history[:-1], st.session_state.kb_index)
+                            cached_mp3 = tts_cache.path(tts_key(cached)) if cached else None
+                            if cached_mp3 and cached_mp3.exists():
+                                # repeated question: replay the stored answer and audio, no completion or TTS
+                                st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{cached}</div>", unsafe_allow_html=True)
+                                with audio_player_container:
+                                    st.audio(str(cached_mp3), format="audio/mp3", autoplay=True)
+                                resp, mp3_path = cached, str(cached_mp3)
+                            else:
+                                pipeline = SpeechPipeline(openai_synthesizer(get_openai_client()))
+                                with audio_player_container:
+                                    player = st.empty()
+                                resp = render_streamed_reply(
+                                    st.empty(),
+                                    speak_while_streaming(stream_openai(text_input, st.session_state.chat_history[:-1]), pipeline, player),
+                                )
+                                mp3_path = save_reply_audio(pipeline, resp)
                             st.session_state.last_response = resp
-                            st.markdown(f"<div class='assistant-bubble'><strong>ValleyHelps:</strong><br>{resp}</div>", unsafe_allow_html=True)
                             st.session_state.chat_history.append({"role":"assistant","content":resp})
-                            mp3_path = text_to_speech(resp)
                             if mp3_path:
-                                # Clean up previous audio files before setting the new one
-                                if st.session_state.audio_path and os.path.exists(st.session_state.audio_path):
-                                    cleanup_cache(mp3_path)
+                                # the full reply becomes the replay player on the next rerun
                                 st.session_state.audio_path = mp3_path
-                                with audio_player_container:
-                                    audio_player_container.empty()  # Clear previous audio players
-                                    st.markdown(get_html_player(mp3_path), unsafe_allow_html=True)
                                 try:
                                     if os.path.exists(wav) and wav != mp3_path:
                                         os.unlink(wav)
                                 except Exception as e:
-                                    print(f"Error cleaning up recording: {e}")
+                                    report_error("recording_cleanup", e)
                             else:
                                 st.error("❌ Couldn't generate speech")
                         else:
@@ -627,8 +672,8 @@ with tab1:
                             except:
                                 pass
 
-# Tab 2: Career Planning
-with tab2:
+@st.fragment
+def career_tab():
     st.header("Career Planning and Growth")
     resume_col, job_col = st.columns(2)
     with resume_col:
@@ -642,27 +687,15 @@ with tab2:
         resume_text = extract_text_from_pdf(uploaded_resume)
         job_desc_text = extract_text_from_pdf(uploaded_job_description)
         if resume_text and job_desc_text:
+            comparison = prescore(resume_text, job_desc_text)
+            if comparison["comparable"] and comparison["score"] is not None:
+                # shown straight away, before the model's explanation arrives
+                st.metric("Skills Match", f"{comparison['score']}/100")
+                st.caption(f"✅ Matched: {', '.join(comparison['matched_skills']) or 'none'}")
+                st.caption(f"⚠️ Missing: {', '.join(comparison['missing_skills'] + comparison['missing_certifications']) or 'none'}")
             st.info("🔄 Analyzing Resume and Job Description...")
-            prompt = f"""
-            Compare the following resume to the desired job description and provide a match score (0-100). 
-            Additionally, identify missing skills or qualifications and suggest ways to bridge the gap.
-
-            Resume:
-            {resume_text}
-
-            Job Description:
-            {job_desc_text}
-            """
             with st.spinner("AI is analyzing your documents..."):
-                client = get_openai_client()
-                completion = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an HR system focusing on internal employee growth."},
-                        {"role": "user", "content": prompt},
-                    ]
-                )
-                st.session_state.match_analysis = completion.choices[0].message.content.strip()
+                st.session_state.match_analysis = core.career_match(get_openai_client(), resume_text, job_desc_text, comparison=comparison)
                 st.success("✅ Analysis complete!")
 
     if st.session_state.match_analysis:
@@ -680,28 +713,35 @@ with tab2:
                 ["Job Performance Improvement", "Career Advancement", "Professional Growth"],
                 key="career_goal_select"
             )
-            st.session_state.career_goal = career_goal
-            resources_prompt = f"""
-            Based on the selected career goal: {career_goal}, and the match analysis above, suggest tailored growth plans.
-
-            Include these available resources from the company:
-            {''.join(resource_texts) if resource_texts else "No resources uploaded."}
-            """
+            if career_goal != st.session_state.career_goal:
+                # the events tab follows the career goal
+                st.session_state.career_goal = career_goal
+                st.rerun()
             with st.spinner("Generating personalized development plan..."):
-                client = get_openai_client()
-                completion = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an HR system providing career development advice."},
-                        {"role": "user", "content": resources_prompt},
-                    ]
-                )
-                analysis = completion.choices[0].message.content.strip()
+                analysis = core.growth_plan(get_openai_client(), career_goal, st.session_state.career_resources)
                 st.subheader("🚀 Career Development Suggestions")
                 st.write(analysis)
 
-# Tab 3: Events Exploration
-with tab3:
+    st.divider()
+    with st.expander("📋 Batch Screening: many resumes against one or more postings"):
+        batch_resume_col, batch_job_col = st.columns(2)
+        with batch_resume_col:
+            batch_resumes = st.file_uploader("Resumes (PDF, text or a zip of them)", type=["pdf", "txt", "zip"], accept_multiple_files=True, key="batch_resumes")
+        with batch_job_col:
+            batch_jobs = st.file_uploader("Job Descriptions (PDF or text)", type=["pdf", "txt"], accept_multiple_files=True, key="batch_jobs")
+        if st.button("▶️ Run Batch Match", disabled=not (batch_resumes and batch_jobs and openai_api_key)):
+            run_batch_match(batch_resumes, batch_jobs)
+        elif st.session_state.batch_results:
+            st.dataframe(batch_table(st.session_state.batch_results["results"]), use_container_width=True, hide_index=True)
+        if st.session_state.batch_results:
+            results = st.session_state.batch_results["results"]
+            st.metric("Throughput", f"{st.session_state.batch_results['rate']:.1f} resumes/min")
+            csv_buffer = io.StringIO()
+            batch.write_csv(results, csv_buffer)
+            st.download_button("⬇️ Download CSV", csv_buffer.getvalue(), file_name="batch_matches.csv", mime="text/csv")
+
+@st.fragment
+def events_tab():
     st.header("Events Exploration")
     st.write("Explore professional development events to help achieve your career goals:")
 
@@ -719,7 +759,8 @@ with tab3:
                 relevant_events = analyze_event_relevance(
                     st.session_state.events_data,
                     st.session_state.match_analysis,
-                    st.session_state.career_goal
+                    st.session_state.career_goal,
+                    index=st.session_state.events_index,
                 )
                 if relevant_events:
                     st.subheader("🎯 Events Matching Your Career Goals")
@@ -733,27 +774,17 @@ with tab3:
                                 <p>{event['Description']}</p>
                             </div>
                             """, unsafe_allow_html=True)
-                    event_details = "\n".join(
-                        [f"{event['Event Name']}: {event['Description']}" for event in relevant_events]
-                    )
-                    summary_prompt = f"""
-                    Based on the user's match analysis and career goal of "{st.session_state.career_goal}", the following events were identified as relevant:
-
-                    {event_details}
-
-                    Generate a concise summary explaining how these events collectively support the user's career development and help them achieve their goals.
-                    """
-                    client = get_openai_client()
-                    completion = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "You are an expert career planner."},
-                            {"role": "user", "content": summary_prompt},
-                        ]
-                    )
-                    summary = completion.choices[0].message.content.strip()
-                    st.subheader("📝 Summary of Recommendations")
-                    st.write(summary)
+                    try:
+                        summary = core.events_summary(
+                            get_openai_client(),
+                            st.session_state.career_goal,
+                            [(event['Event Name'], event['Description']) for event in relevant_events],
+                        )
+                        st.subheader("📝 Summary of Recommendations")
+                        st.write(summary)
+                    except Exception as e:
+                        report_error("events_summary", e)
+                        st.error(f"❌ Couldn't generate a summary: {e}")
                 else:
                     st.warning("⚠️ No matching events found for your career goals.")
         else:
@@ -761,6 +792,40 @@ with tab3:
     else:
         st.warning("⚠️ No events data found. Please upload a CSV file in the admin sidebar.")
 
+# Custom Header
+st.image("images/valleyhelpsbannerfinalver1.png", width=800)
+st.markdown("<h1 style='margin-bottom:0'>HR Assistant</h1>", unsafe_allow_html=True)
+
+# Status Indicators
+status_col1, status_col2 = st.columns(2)
+with status_col1:
+    if st.session_state.kb_index:
+        kb_names = list(st.session_state.kb_docs)
+        if kb_names:
+            st.markdown(f"<div class='kb-status kb-active'>📚 Using: {', '.join(kb_names)}</div>", unsafe_allow_html=True)
+        else:
+            st.markdown("<div class='kb-status kb-active'>📚 Knowledge Base Active</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='kb-status kb-inactive'>⚠️ No Knowledge Base</div>", unsafe_allow_html=True)
+with status_col2:
+    if st.session_state.audio_mode:
+        st.markdown("<div class='kb-status kb-active'>🎙️ Voice Mode Active</div>", unsafe_allow_html=True)
+
+# Main Tabs
+tab1, tab2, tab3 = st.tabs(["💬 Chat Assistant", "📈 Career Planning", "🎉 Events Exploration"])
+
+# Tab 1: Chat Assistant
+with tab1:
+    chat_tab()
+
+# Tab 2: Career Planning
+with tab2:
+    career_tab()
+
+# Tab 3: Events Exploration
+with tab3:
+    events_tab()
+
 # Footer
 st.markdown("""
 <div class="footer">
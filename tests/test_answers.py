@@ -0,0 +1,35 @@
+from valleyhelps.answers import AnswerCache
+
+VACATION = "Vacation accrues at ten hours per month."
+
+
+def _cache():
+    cache = AnswerCache(similarity=0.9)
+    cache.set("Can full time employees carry over unused vacation leave hours into the next calendar year?", "scope", VACATION)
+    cache.set("How many hours of vacation do full time employees accrue per month after 5 years of service?",
+              "scope", "Twelve hours per month.")
+    return cache
+
+
+def test_rephrasing_reuses_answer():
+    cache = AnswerCache(similarity=0.9)
+    cache.set("What's the vacation policy?", "scope", VACATION)
+    assert cache.get("Could you tell me the vacation policy please", "scope") == VACATION
+    assert cache.get("What's the vacation policy?", "other scope") is None
+
+
+def test_different_leave_type_is_not_a_duplicate():
+    # cosine 0.92 over content words
+    assert _cache().get("Can full time employees carry over unused sick leave hours into the next calendar year?", "scope") is None
+
+
+def test_different_number_is_not_a_duplicate():
+    # cosine 0.92 over content words
+    assert _cache().get("How many hours of vacation do full time employees accrue per month after 15 years of service?",
+                        "scope") is None
+
+
+def test_need_and_want_are_different_questions():
+    cache = AnswerCache(similarity=0.9)
+    cache.set("Do I need a doctor's note for sick leave?", "scope", "Yes, after three days.")
+    assert cache.get("Do I want a doctor's note for sick leave?", "scope") is None
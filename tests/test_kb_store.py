@@ -0,0 +1,44 @@
+import os
+
+from starlette.testclient import TestClient
+
+from valleyhelps import api
+from valleyhelps.kb_store import KBStore
+
+
+def _secret(tmp_path):
+    secret = tmp_path / "secret_notes.txt"
+    secret.write_text("do not serve this", encoding="utf-8")
+    os.utime(secret, (1_000_000, 1_000_000))
+    return secret
+
+
+def test_get_rejects_path_traversal(tmp_path):
+    secret = _secret(tmp_path)
+    store = KBStore(tmp_path / "kb")
+    for doc_id in ("../secret_notes", str(secret.with_suffix("")), "", None, {"id": 1}, "A" * 64):
+        assert store.get(doc_id) is None
+        assert store.segment(doc_id) is None
+    assert store.index(["../secret_notes"]) is None
+    assert secret.stat().st_mtime == 1_000_000
+
+
+def test_stored_documents_still_resolve(tmp_path):
+    store = KBStore(tmp_path / "kb")
+    doc_id = store.put("Vacation accrues at ten hours per month.", "mou.pdf")
+    assert KBStore(tmp_path / "kb").get(doc_id).text.startswith("Vacation")
+    assert store.index([doc_id]).chunk_count == 1
+
+
+def test_chat_rejects_malformed_kb_ids(tmp_path):
+    secret = _secret(tmp_path)
+    client = TestClient(api.app)  # no lifespan: rejected before any model call
+    for body in (
+        {"message": "hi", "kb_id": "../../../secret_notes"},
+        {"message": "hi", "kb_id": str(secret.with_suffix(""))},
+        {"message": "hi", "kb_ids": [{"id": "x"}]},
+        {"message": "hi", "kb_ids": [["a"]]},
+    ):
+        resp = client.post("/chat", json=body)
+        assert resp.status_code == 400, body
+    assert secret.stat().st_mtime == 1_000_000
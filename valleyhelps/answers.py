@@ -0,0 +1,137 @@
+"""Cache of chat answers to repeated questions.
+
+Answers are keyed by the normalized question plus a scope: the system prompt,
+the model and the knowledge base version. Editing the KB therefore never
+serves a stale answer. When there is no exact match, a question with exactly
+the same content words as a cached one (every word and number except
+stopwords, greetings and a leading "could you tell me" or "please") reuses
+that answer. That catches rephrasings like "what's the vacation policy?" /
+"could you tell me the vacation policy please". A single differing word or
+number ("sick" for "vacation", "15 years" for "5 years") is a different
+question, however similar the rest.
+
+A cached answer ignores the earlier conversation. Questions that look like
+follow-ups ("what about part-timers?", "can you explain that?") bypass the
+cache once there is history.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from valleyhelps.cache import LRUCache, result_key
+from valleyhelps.metrics import metrics
+from valleyhelps.retrieval import tokenize
+
+ANSWER_CACHE_TTL = int(os.getenv("VALLEYHELPS_ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_ENTRIES = int(os.getenv("VALLEYHELPS_ANSWER_CACHE_ENTRIES", "1024"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("VALLEYHELPS_ANSWER_CACHE_SIMILARITY", "0.9"))  # 0 disables
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CONTRACTIONS = [("n't", " not"), ("'re", " are"), ("'s", " is"), ("'ve", " have"), ("'ll", " will"), ("'d", " would"), ("'m", " am")]
+_FOLLOW_UP_RE = re.compile(
+    r"\b(it|its|that|this|those|these|they|them|their|he|she|above|previous|earlier|"
+    r"else|more|again|also|too|why|what about|how about)\b"
+)
+# leading politeness only: "need", "want" or "know" elsewhere in a question carry meaning
+_POLITE_PREFIX = re.compile(
+    r"^(?:(?:hi|hello|hey|please|kindly)\s+)*"
+    r"(?:(?:can|could|would|will) you (?:please )?(?:tell|show|explain to) me (?:about )?|"
+    r"i would like to know (?:about )?|i want to know (?:about )?|tell me (?:about )?|explain )?"
+)
+_FILLER = frozenset("please kindly hi hello hey thanks thank".split())
+MIN_STANDALONE_WORDS = 3
+
+
+def normalize_question(question):
+    question = question.lower().replace("\u2019", "'")
+    for contraction, expansion in _CONTRACTIONS:
+        question = question.replace(contraction, expansion)
+    return " ".join(_WORD_RE.findall(question))
+
+
+def is_standalone(question, history):
+    """Whether the question can be answered without the earlier turns."""
+    if not history:
+        return True
+    normalized = normalize_question(question)
+    return len(tokenize(normalized)) >= MIN_STANDALONE_WORDS and not _FOLLOW_UP_RE.search(normalized)
+
+
+def _question_words(normalized):
+    return Counter(w for w in tokenize(_POLITE_PREFIX.sub("", normalized)) if w not in _FILLER)
+
+
+def _cosine(a, b):
+    dot = sum(count * b[word] for word, count in a.items() if word in b)
+    if not dot:
+        return 0.0
+    return dot / math.sqrt(sum(v * v for v in a.values()) * sum(v * v for v in b.values()))
+
+
+class AnswerCache:
+    def __init__(self, max_entries=ANSWER_CACHE_ENTRIES, ttl=ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.similarity = similarity
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._answers = LRUCache(max_entries, ttl=ttl)
+        self._questions = {}  # scope -> {content words: (key, Counter of them)}
+        self._lock = threading.Lock()
+
+    def get(self, question, scope):
+        normalized = normalize_question(question)
+        answer = self._answers.get(result_key(scope, "", question=normalized))
+        if answer is not None:
+            self.hits += 1
+            return answer
+        if self.similarity:
+            answer = self._similar(_question_words(normalized), scope)
+            if answer is not None:
+                self.similar_hits += 1
+                return answer
+        self.misses += 1
+        return None
+
+    def set(self, question, scope, answer):
+        normalized = normalize_question(question)
+        key = result_key(scope, "", question=normalized)
+        self._answers.set(key, answer)
+        words = _question_words(normalized)
+        if self.similarity and words:
+            with self._lock:
+                self._questions.setdefault(scope, {})[frozenset(words)] = (key, words)
+                if sum(len(q) for q in self._questions.values()) > 2 * self._answers.max_entries:
+                    self._prune()
+
+    def clear(self):
+        self._answers.clear()
+        with self._lock:
+            self._questions.clear()
+
+    def stats(self):
+        return {"entries": len(self._answers), "hits": self.hits, "similar_hits": self.similar_hits, "misses": self.misses}
+
+    def _similar(self, words, scope):
+        if not words:
+            return None
+        with self._lock:
+            match = self._questions.get(scope, {}).get(frozenset(words))
+        # the same words, at most repeated a different number of times
+        if match is None or _cosine(words, match[1]) < self.similarity:
+            return None
+        return self._answers.get(match[0])
+
+    def _prune(self):
+        # drop question vectors whose answers the LRU has already evicted
+        for scope in list(self._questions):
+            kept = {k: v for k, v in self._questions[scope].items() if v[0] in self._answers}
+            if kept:
+                self._questions[scope] = kept
+            else:
+                del self._questions[scope]
+
+
+answer_cache = AnswerCache()
+metrics.register("answer_cache", answer_cache.stats)
@@ -0,0 +1,283 @@
+"""Headless HTTP API over the HR assistant core.
+
+    python -m valleyhelps.api --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints (JSON in, JSON out unless noted):
+
+    GET  /health
+    POST /kb                 PDF bytes (Content-Type: application/pdf) or {"url": ...}
+                             -> {"kb_id", "chunks", "tokens"}
+    POST /chat               {"message", "history"?, "kb_id" | "kb_ids"?, "stream"?}
+                             -> {"reply"}, or text/plain chunks when "stream" is true
+    POST /career/match       {"resume_text" | "resume_pdf_base64",
+                              "job_description_text" | "job_description_pdf_base64"}
+                             -> {"analysis"}
+    POST /events/recommend   {"events": [{"Event Name", "Description", ...}],
+                              "match_analysis", "career_goal", "summary"?}
+                             -> {"events", "summary"?, "warning"?}
+    GET  /metrics            Prometheus text format (see valleyhelps.metrics)
+
+Errors are {"error"} with status 400 for invalid requests, 413 for PDF
+uploads over VALLEYHELPS_DOWNLOAD_MAX_MB, 422 for PDFs without readable
+text and 502 when the model call fails.
+
+Knowledge bases live in the shared store (valleyhelps.kb_store), so a kb_id
+returned by one worker is usable on every other worker. The default KB (the
+prebuilt VALLEYHELPS_KB_ARTIFACT, else DEFAULT_KB_URL) is loaded at startup
+and its document ids are reported by /health.
+
+Chat and event scoring use the async OpenAI client directly. PDF parsing and
+the cached career completions run on the thread pool, so the event loop never
+blocks.
+"""
+import argparse
+import base64
+import binascii
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from valleyhelps import core
+from valleyhelps.cache import MB
+from valleyhelps.download import DOWNLOAD_MAX_MB
+from valleyhelps.ingest import KB_ARTIFACT, load_artifact
+from valleyhelps.kb_store import DEFAULT_KB_URL, is_doc_id, kb_store
+from valleyhelps.metrics import metrics, report_error, span
+from valleyhelps.pdf import cached_pdf_text
+from valleyhelps.retrieval import KB_USE_EMBEDDINGS
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class UnreadableDocument(BadRequest):
+    status_code = 422
+
+
+class PayloadTooLarge(BadRequest):
+    status_code = 413
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.client = core.openai_client()
+    app.state.aclient = core.async_openai_client()
+    app.state.default_kb_ids = []
+    try:
+        if KB_ARTIFACT:
+            app.state.default_kb_ids = [doc_id for _, doc_id in await run_in_threadpool(load_artifact, KB_ARTIFACT)]
+        elif DEFAULT_KB_URL:
+            app.state.default_kb_ids = [await run_in_threadpool(kb_store.load_url, DEFAULT_KB_URL)]
+    except Exception as e:
+        report_error("default_kb", e)
+    yield
+    await app.state.aclient.close()
+    app.state.client.close()
+
+
+async def _json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object")
+    return body
+
+
+async def _document_text(body, field):
+    """Text from `<field>_text`, or from a base64 PDF in `<field>_pdf_base64`."""
+    if body.get(f"{field}_text"):
+        return body[f"{field}_text"]
+    encoded = body.get(f"{field}_pdf_base64")
+    if not encoded:
+        raise BadRequest(f"Provide {field}_text or {field}_pdf_base64")
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise BadRequest(f"{field}_pdf_base64 is not valid base64")
+    return await _pdf_text(data)
+
+
+async def _pdf_text(data):
+    try:
+        text = await run_in_threadpool(cached_pdf_text, data)
+    except Exception as e:
+        raise UnreadableDocument(f"Could not read the PDF: {e}")
+    if not text.strip():
+        raise UnreadableDocument("The PDF contains no extractable text")
+    return text
+
+
+async def _pdf_body(request, max_bytes=DOWNLOAD_MAX_MB * MB):
+    """The uploaded PDF, read up to the same size limit as downloads."""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise PayloadTooLarge(f"Upload is {int(length) / MB:.1f} MB; the limit is {max_bytes / MB:.0f} MB")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:  # chunked, or a Content-Length that understated the body
+            raise PayloadTooLarge(f"Upload exceeds the {max_bytes / MB:.0f} MB limit")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _history(body):
+    history = body.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict) and m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise BadRequest('history must be a list of {"role": "user" | "assistant", "content": <string>}')
+    return [{"role": m["role"], "content": m["content"]} for m in history]
+
+
+def _errors(handler):
+    async def wrapped(request):
+        with span("request", route=handler.__name__):
+            try:
+                return await handler(request)
+            except BadRequest as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status_code)
+            except Exception as e:
+                report_error("request", e, route=handler.__name__)
+                return JSONResponse({"error": str(e)}, status_code=502)
+    return wrapped
+
+
+# ─── Endpoints ──────────────────────────────────────────────────────────────────
+async def health(request):
+    default_kb_ids = request.app.state.default_kb_ids
+    return JSONResponse({
+        "status": "ok",
+        "default_kb_id": default_kb_ids[0] if default_kb_ids else None,
+        "default_kb_ids": default_kb_ids,
+    })
+
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _kb_index(request, kb_ids):
+    embed = core.embedder(request.app.state.client) if KB_USE_EMBEDDINGS else None
+    return kb_store.index(kb_ids, embed=embed)
+
+
+async def ingest_kb(request):
+    if request.headers.get("content-type", "").startswith("application/pdf"):
+        data = await _pdf_body(request)
+    else:
+        url = (await _json(request)).get("url")
+        if not url:
+            raise BadRequest("Send PDF bytes or a JSON body with a url")
+        f = await run_in_threadpool(core.download_pdf, url)
+        if f is None:
+            raise BadRequest(f"Failed to fetch PDF from {url}")
+        data = f.getvalue()
+    try:
+        kb_id = await run_in_threadpool(kb_store.put_pdf, data)
+    except Exception as e:
+        raise UnreadableDocument(f"Could not read the PDF: {e}")
+    doc = kb_store.get(kb_id)
+    if doc is None or not doc.text.strip():
+        raise UnreadableDocument("The PDF contains no extractable text")
+    index = await run_in_threadpool(_kb_index, request, (kb_id,))
+    return JSONResponse({
+        "kb_id": kb_id,
+        "chunks": index.chunk_count if index else 0,
+        "tokens": index.total_tokens if index else 0,
+    })
+
+
+async def chat(request):
+    body = await _json(request)
+    message = body.get("message")
+    if not message or not isinstance(message, str):
+        raise BadRequest("message is required")
+    history = _history(body)
+    kb_ids = body.get("kb_ids") or ([body["kb_id"]] if body.get("kb_id") else [])
+    if not isinstance(kb_ids, list) or not all(is_doc_id(kb_id) for kb_id in kb_ids):
+        raise BadRequest("kb_ids must be a list of ids returned by POST /kb")
+    for kb_id in kb_ids:
+        if kb_store.get(kb_id) is None:
+            raise BadRequest(f"Unknown kb_id {kb_id}")
+    kb_index = await run_in_threadpool(_kb_index, request, tuple(kb_ids)) if kb_ids else None
+    aclient = request.app.state.aclient
+    if body.get("stream"):
+        return StreamingResponse(_stream_errors(core.astream_chat(aclient, message, history, kb_index)), media_type="text/plain")
+    return JSONResponse({"reply": await core.achat(aclient, message, history, kb_index)})
+
+
+async def _stream_errors(chunks):
+    # the status line is already sent, so a failure mid-stream ends the body with the error
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        report_error("request", e, route="chat", stream=True)
+        yield f"\nError: {e}"
+
+
+async def career_match(request):
+    body = await _json(request)
+    resume_text = await _document_text(body, "resume")
+    job_desc_text = await _document_text(body, "job_description")
+    analysis = await run_in_threadpool(core.career_match, request.app.state.client, resume_text, job_desc_text)
+    return JSONResponse({"analysis": analysis})
+
+
+async def recommend_events(request):
+    body = await _json(request)
+    events = body.get("events")
+    if not isinstance(events, list) or not body.get("match_analysis") or not body.get("career_goal"):
+        raise BadRequest("events, match_analysis and career_goal are required")
+    try:
+        rows = [(i, e["Event Name"], e["Description"]) for i, e in enumerate(events)]
+    except (KeyError, TypeError):
+        raise BadRequest('Each event needs "Event Name" and "Description"')
+    ids, error = await core.arecommend_events(
+        request.app.state.aclient, rows, body["match_analysis"], body["career_goal"]
+    )
+    result = {"events": [events[i] for i in ids]}
+    if error:
+        result["warning"] = f"AI event scoring unavailable ({error}); showing keyword matches"
+    if body.get("summary") and ids:
+        result["summary"] = await run_in_threadpool(
+            core.events_summary, request.app.state.client, body["career_goal"],
+            [(events[i]["Event Name"], events[i]["Description"]) for i in ids],
+        )
+    return JSONResponse(result)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/kb", _errors(ingest_kb), methods=["POST"]),
+        Route("/chat", _errors(chat), methods=["POST"]),
+        Route("/career/match", _errors(career_match), methods=["POST"]),
+        Route("/events/recommend", _errors(recommend_events), methods=["POST"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the ValleyHelps HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("valleyhelps.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
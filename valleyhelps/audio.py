@@ -0,0 +1,79 @@
+"""Per-session audio files and the background sweeper for every audio cache.
+
+Recordings live under cache/audio/<session id>/ with random names, so
+concurrent sessions never collide or delete each other's files. A single
+daemon thread per process enforces the size and age limits. The shared TTS
+cache is swept by the same thread, so no request pays for a directory scan.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from valleyhelps.cache import MB, prune_files
+from valleyhelps.metrics import report_error
+from valleyhelps.speech import tts_cache
+
+AUDIO_CACHE_MB = int(os.getenv("VALLEYHELPS_AUDIO_CACHE_MB", "256"))
+AUDIO_MAX_AGE_MINUTES = float(os.getenv("VALLEYHELPS_AUDIO_MAX_AGE_MINUTES", "60"))
+AUDIO_SWEEP_SECONDS = float(os.getenv("VALLEYHELPS_AUDIO_SWEEP_SECONDS", "60"))
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class AudioStore:
+    def __init__(self, root, max_bytes, max_age, interval):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self.bytes = 0
+        self.caches = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def new_path(self, session_id, kind, suffix):
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        directory = self.root / session_id
+        directory.mkdir(exist_ok=True)
+        return directory / f"{kind}_{uuid.uuid4().hex}{suffix}"
+
+    def watch(self, cache):
+        self.caches.append(cache)
+
+    def sweep(self):
+        self.bytes = prune_files(self.root.glob("*/*"), self.max_bytes, self.max_age)
+        cutoff = time.time() - self.max_age
+        for directory in self.root.iterdir():
+            try:
+                # only drop idle session folders, so a fresh mkdir is never raced
+                if directory.is_dir() and directory.stat().st_mtime < cutoff:
+                    directory.rmdir()
+            except OSError:
+                pass
+        for cache in self.caches:
+            cache.evict()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="valleyhelps-audio-sweeper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                report_error("audio_sweep", e)
+            time.sleep(self.interval)
+
+
+audio_store = AudioStore(
+    Path("cache") / "audio", AUDIO_CACHE_MB * MB, AUDIO_MAX_AGE_MINUTES * 60, AUDIO_SWEEP_SECONDS
+)
+audio_store.watch(tts_cache)
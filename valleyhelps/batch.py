@@ -0,0 +1,191 @@
+"""Batch career matching: many resumes against one or more job descriptions.
+
+    python -m valleyhelps.batch resumes/ --job posting.pdf [--job other.txt] [--out matches.csv]
+
+Resumes can come from a folder or a zip of PDF and text files. Text is
+extracted in parallel through the shared PDF cache. Every resume/job pair
+then runs the same career match prompt as the single-resume tab,
+concurrently and in the scheduler's batch lane, so interactive users are
+served first. Repeated pairs are answered from the LLM result cache.
+
+Local pre-scores (valleyhelps.skills) for every pair are available before
+any model call. Results are yielded as each match completes, so the CLI and
+the Streamlit tab can show them as they arrive. Pairs are identified by
+position (result["pair"]), so documents that share a name stay separate rows.
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from valleyhelps import core
+from valleyhelps.pdf import cached_pdf_texts
+from valleyhelps.scheduler import BATCH
+from valleyhelps.skills import prescore
+
+BATCH_WORKERS = int(os.getenv("VALLEYHELPS_BATCH_WORKERS", "8"))
+DOCUMENT_SUFFIXES = (".pdf", ".txt")
+CSV_FIELDS = ["resume", "job", "score", "prescore", "analysis", "error"]
+
+_SCORE_RE = re.compile(r"score\D{0,40}?(\d{1,3})\b", re.IGNORECASE)
+_SCALE_RE = re.compile(r"\(?\b0\s*(?:-|–|to)\s*100\b\)?")  # "(0-100)" restated from the prompt
+
+
+# ─── Inputs ─────────────────────────────────────────────────────────────────────
+def _is_document(name):
+    return name.lower().endswith(DOCUMENT_SUFFIXES) and not Path(name).name.startswith((".", "__"))
+
+
+def documents_from_zip(data):
+    """(name, bytes) for every PDF or text file in a zip archive."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return [
+            (info.filename, archive.read(info))
+            for info in sorted(archive.infolist(), key=lambda info: info.filename)
+            if not info.is_dir() and _is_document(info.filename)
+        ]
+
+
+def read_documents(path):
+    """(name, bytes) for a single file, every document in a folder, or a zip archive."""
+    path = Path(path)
+    if path.is_dir():
+        return [(str(f.relative_to(path)), f.read_bytes()) for f in sorted(path.rglob("*")) if f.is_file() and _is_document(f.name)]
+    if zipfile.is_zipfile(path):
+        return documents_from_zip(path.read_bytes())
+    return [(path.name, path.read_bytes())]
+
+
+def extract_documents(documents):
+    """Return (name, text) pairs; text is an Exception when extraction failed."""
+    pdfs = [i for i, (name, _) in enumerate(documents) if name.lower().endswith(".pdf")]
+    texts = [None if i in pdfs else data.decode("utf-8", errors="replace") for i, (_, data) in enumerate(documents)]
+    for i, text in zip(pdfs, cached_pdf_texts([documents[i][1] for i in pdfs])):
+        texts[i] = text
+    return [(name, text) for (name, _), text in zip(documents, texts)]
+
+
+# ─── Matching ───────────────────────────────────────────────────────────────────
+def parse_score(analysis):
+    """The 0-100 match score from a career match analysis, if it states one."""
+    match = _SCORE_RE.search(_SCALE_RE.sub("", analysis or ""))
+    if match and int(match.group(1)) <= 100:
+        return int(match.group(1))
+    return None
+
+
+def _result(pair, resume, job, comparison=None, analysis="", error=""):
+    # a comparable pre-score is the final score; otherwise it comes from the model's reply
+    final = comparison["score"] if comparison and comparison["comparable"] else parse_score(analysis)
+    return {
+        "pair": pair, "resume": resume, "job": job, "score": final if analysis else None,
+        "prescore": comparison["score"] if comparison else None, "analysis": analysis, "error": error,
+    }
+
+
+def _failed(*texts):
+    failed = next((t for t in texts if isinstance(t, Exception) or not t), None)
+    return None if failed is None else (str(failed) or "No text extracted")
+
+
+def prescore_pairs(resumes, jobs):
+    """(resume index, job index) -> local comparison for every pair with readable text."""
+    return {
+        (i, j): prescore(resume_text, job_text)
+        for i, (_, resume_text) in enumerate(resumes)
+        for j, (_, job_text) in enumerate(jobs)
+        if _failed(resume_text, job_text) is None
+    }
+
+
+def pending_results(resumes, jobs, comparisons):
+    """Placeholder rows carrying just the pre-score, to show before the model answers."""
+    return [
+        _result((i, j), resume, job, comparisons.get((i, j)), error=_failed(resume_text, job_text) or "")
+        for i, (resume, resume_text) in enumerate(resumes)
+        for j, (job, job_text) in enumerate(jobs)
+    ]
+
+
+def iter_matches(client, resumes, jobs, workers=BATCH_WORKERS, comparisons=None):
+    """Yield a result dict per (resume, job) pair, in completion order.
+
+    `resumes` and `jobs` are (name, text) pairs as returned by extract_documents.
+    """
+    comparisons = comparisons if comparisons is not None else prescore_pairs(resumes, jobs)
+    executor = ThreadPoolExecutor(max(1, workers))
+    try:
+        futures = {}
+        for i, (resume, resume_text) in enumerate(resumes):
+            for j, (job, job_text) in enumerate(jobs):
+                error = _failed(resume_text, job_text)
+                if error:
+                    yield _result((i, j), resume, job, error=error)
+                    continue
+                comparison = comparisons[(i, j)]
+                future = executor.submit(
+                    core.career_match, client, resume_text, job_text, priority=BATCH, comparison=comparison
+                )
+                futures[future] = ((i, j), resume, job, comparison)
+        for future in as_completed(futures):
+            pair, resume, job, comparison = futures[future]
+            try:
+                yield _result(pair, resume, job, comparison, future.result())
+            except Exception as e:
+                yield _result(pair, resume, job, comparison, error=str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def resumes_per_minute(matches_done, job_count, seconds):
+    if not seconds or not job_count:
+        return 0.0
+    return matches_done / job_count / (seconds / 60)
+
+
+def write_csv(results, f):
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(sorted(results, key=lambda r: -1 if r["score"] is None else r["score"], reverse=True))
+
+
+# ─── CLI ────────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Match a folder or zip of resumes against job descriptions.")
+    parser.add_argument("resumes", help="resume file, folder or zip archive (PDF or text)")
+    parser.add_argument("--job", action="append", required=True, help="job description file (PDF or text); repeatable")
+    parser.add_argument("--out", default="matches.csv", help="CSV output path (default: matches.csv)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    resumes = extract_documents(read_documents(args.resumes))
+    jobs = extract_documents([doc for path in args.job for doc in read_documents(path)])
+    for name, text in jobs:
+        if isinstance(text, Exception) or not text:
+            sys.exit(f"Couldn't read job description {name}: {text}")
+    print(f"Extracted {len(resumes)} resumes and {len(jobs)} job descriptions in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    start = time.perf_counter()
+    for result in iter_matches(core.openai_client(), resumes, jobs, args.workers):
+        results.append(result)
+        score = "err" if result["error"] else ("?" if result["score"] is None else result["score"])
+        pre = "-" if result["prescore"] is None else result["prescore"]
+        print(f"[{len(results)}/{len(resumes) * len(jobs)}] {score:>4} (pre {pre:>3})  {result['resume']}  vs  {result['job']}")
+    elapsed = time.perf_counter() - start
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        write_csv(results, f)
+    rate = resumes_per_minute(sum(not r["error"] for r in results), len(jobs), elapsed)
+    print(f"Wrote {args.out}: {len(results)} matches in {elapsed:.1f}s ({rate:.1f} resumes/min)")
+
+
+if __name__ == "__main__":
+    main()
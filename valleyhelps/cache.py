@@ -0,0 +1,224 @@
+"""Bounded caches shared by every session in the process."""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from valleyhelps.metrics import metrics
+
+
+MB = 1024 * 1024
+LLM_CACHE_TTL = int(os.getenv("VALLEYHELPS_LLM_CACHE_TTL", "3600"))
+LLM_CACHE_ENTRIES = int(os.getenv("VALLEYHELPS_LLM_CACHE_ENTRIES", "512"))
+LLM_CACHE_MB = int(os.getenv("VALLEYHELPS_LLM_CACHE_MB", "32"))
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+# ─── In-Memory LRU ──────────────────────────────────────────────────────────────
+class LRUCache:
+    """Thread-safe LRU with optional total-size and time-to-live limits.
+
+    `on_evict(value)` is called, outside the lock, for values pushed out by
+    the limits, e.g. to release resources they hold.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, ttl=None, sizeof=len, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and (item[2] is None or item[2] >= time.monotonic())
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, size, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                evicted.append(self._drop(next(iter(self._data))))
+        if self.on_evict:
+            for old in evicted:
+                self.on_evict(old)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._data), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _drop(self, key):
+        value, size, _ = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+
+# ─── LLM Results ────────────────────────────────────────────────────────────────
+def result_key(template, model, **inputs):
+    """Key an LLM result by prompt template, model and a hash of every input."""
+    h = hashlib.sha256()
+    for part in (template, model, *sorted(inputs)):
+        h.update(content_hash(part).encode())
+    for name in sorted(inputs):
+        h.update(content_hash(str(inputs[name])).encode())
+    return h.hexdigest()
+
+
+def _result_size(value):
+    return len(value) if isinstance(value, (str, bytes)) else 64 * max(1, len(value))
+
+
+llm_results = LRUCache(LLM_CACHE_ENTRIES, LLM_CACHE_MB * MB, ttl=LLM_CACHE_TTL, sizeof=_result_size)
+metrics.register("llm_cache", llm_results.stats)
+
+
+# ─── On-Disk Tier ───────────────────────────────────────────────────────────────
+def prune_files(files, max_bytes=None, max_age=None, on_delete=None):
+    """Delete files older than max_age seconds, then oldest first until under max_bytes.
+
+    `on_delete(path)` is called for each deleted file. Returns the number of
+    bytes left.
+    """
+    entries = []
+    for f in files:
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, f))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age if max_age else None
+    for mtime, size, f in entries:
+        expired = cutoff is not None and mtime < cutoff
+        if not expired and (max_bytes is None or total <= max_bytes):
+            break
+        try:
+            f.unlink()
+            total -= size
+        except OSError:
+            continue
+        if on_delete:
+            on_delete(f)
+    return total
+
+
+class DiskCache:
+    """Content-addressed files in one directory, evicted least-recently-used first.
+
+    With background_eviction the directory scan is left to whoever calls
+    evict() periodically (see valleyhelps.audio), keeping it off the write path.
+    `on_evict(path)` is called for each evicted file, e.g. to remove files
+    kept alongside it.
+    """
+
+    def __init__(self, directory, max_bytes, suffix="", max_age=None, background_eviction=False, on_evict=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.suffix = suffix
+        self.background_eviction = background_eviction
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bytes = sum(f.stat().st_size for f in self._files())
+
+    def path(self, key):
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def set(self, key, data):
+        tmp = self.temp_path(key)
+        tmp.write_bytes(data)
+        return self.put_file(key, tmp)
+
+    def temp_path(self, key):
+        """A scratch path in the cache directory, for writing a file to hand to put_file()."""
+        path = self.path(key)
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def put_file(self, key, src):
+        """Move a finished file (e.g. a spooled download) into the cache."""
+        path = self.path(key)
+        size = os.path.getsize(src)
+        with self._lock:
+            old = path.stat().st_size if path.exists() else 0
+            os.replace(src, path)
+            self._bytes += size - old
+        if self._bytes > self.max_bytes and not self.background_eviction:
+            self.evict()
+        return path
+
+    def evict(self):
+        remaining = prune_files(self._files(), self.max_bytes, self.max_age, self.on_evict)
+        with self._lock:
+            self._bytes = remaining
+
+    def stats(self):
+        return {"bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _files(self):
+        return [f for f in self.directory.glob(f"*{self.suffix}") if not f.name.startswith(".")]
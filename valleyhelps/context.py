@@ -0,0 +1,148 @@
+"""Chat history that fits a token budget.
+
+The most recent messages are sent verbatim for as long as they fit. Older
+messages are folded into a running summary, which is sent as one extra system
+message. Folding happens in fixed blocks of messages. Each step (previous
+summary + next block -> new summary) is cached by its inputs, so the stateless
+API, where callers resend the full history on every request, reuses the steps
+already taken. A session can also pass a `state` dict that keeps its running
+summary and how many blocks it covers; later turns then fold only the blocks
+that fell out of the window since.
+
+At most `VALLEYHELPS_SUMMARY_CALLS_PER_TURN` summary calls are made per turn.
+Blocks beyond that, or after a failed call, are dropped for this turn and
+folded on later ones. The history sent never exceeds the budget either way.
+"""
+import os
+
+from valleyhelps.cache import content_hash, llm_results, result_key
+from valleyhelps.metrics import report_error
+from valleyhelps.retrieval import count_tokens
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("VALLEYHELPS_HISTORY_TOKEN_BUDGET", "1500"))
+SUMMARY_TOKENS = int(os.getenv("VALLEYHELPS_SUMMARY_TOKENS", "250"))
+SUMMARY_BLOCK = 6  # messages folded per summary step (three exchanges)
+SUMMARY_CALLS_PER_TURN = int(os.getenv("VALLEYHELPS_SUMMARY_CALLS_PER_TURN", "2"))
+SUMMARY_MODEL = "gpt-4o-mini"
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between an employee and ValleyHelps, an HR assistant.
+Keep what the employee said about themselves (role, department, dates, circumstances), the questions
+they asked and the answers they were given. Reply with the updated summary only, in under {words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + 4  # role and framing
+
+
+def split_history(history, budget=HISTORY_TOKEN_BUDGET, summary_tokens=SUMMARY_TOKENS, block=SUMMARY_BLOCK):
+    """Return (blocks of old messages to summarize, recent messages to send verbatim)."""
+    if sum(message_tokens(m) for m in history) <= budget:
+        return [], list(history)
+    available = budget - summary_tokens - message_tokens({"content": SUMMARY_HEADER})
+    start, used = len(history), 0
+    while start > 0 and used + message_tokens(history[start - 1]) <= available:
+        start -= 1
+        used += message_tokens(history[start])
+    # fold whole blocks only, so the same summary steps come up again on later turns
+    start = min(len(history), -(-start // block) * block)
+    return [history[i:i + block] for i in range(0, start, block)], history[start:]
+
+
+def summary_prompt(summary, block, summary_tokens=SUMMARY_TOKENS):
+    messages = "\n".join(f"{m['role']}: {m['content']}" for m in block)
+    return SUMMARY_PROMPT.format(words=summary_tokens * 3 // 4, summary=summary or "(none)", messages=messages)
+
+
+def _clip(summary, summary_tokens=SUMMARY_TOKENS):
+    return summary if count_tokens(summary) <= summary_tokens else summary[:summary_tokens * 4]
+
+
+def _with_summary(summary, recent):
+    if not summary:
+        return list(recent)
+    return [{"role": "system", "content": SUMMARY_HEADER + summary}, *recent]
+
+
+def _block_key(block):
+    return content_hash("\n".join(f"{m['role']}: {m['content']}" for m in block))
+
+
+def _resume(blocks, state):
+    """(summary, number of blocks it covers) saved in `state`, if they still lead `blocks`."""
+    folded = (state or {}).get("blocks", 0)
+    if 0 < folded <= len(blocks) and state.get("last") == _block_key(blocks[folded - 1]):
+        return state["summary"], folded
+    # a new, cleared or replaced conversation
+    return "", 0
+
+
+def _save(state, blocks, folded, summary):
+    if state is not None and folded:
+        state.update(blocks=folded, last=_block_key(blocks[folded - 1]), summary=summary)
+
+
+def assemble_history(history, summarize=None, budget=HISTORY_TOKEN_BUDGET, state=None,
+                     max_calls=SUMMARY_CALLS_PER_TURN):
+    """Messages to send for `history`. `summarize(prompt)` returns summary text.
+
+    `state` is a dict owned by the conversation; it is updated in place.
+    """
+    blocks, recent = split_history(history, budget)
+    summary, folded = _resume(blocks, state)
+    calls = 0
+    for block in blocks[folded:]:
+        if summarize is None:
+            break
+        prompt = summary_prompt(summary, block)
+        key = result_key(SUMMARY_PROMPT, SUMMARY_MODEL, prompt=prompt)
+        cached = llm_results.get(key)
+        if cached is None:
+            if calls >= max_calls:
+                break
+            calls += 1
+            try:
+                cached = _clip(summarize(prompt))
+            except Exception as e:
+                report_error("summarize", e)
+                break
+            llm_results.set(key, cached)
+        summary = cached
+        folded += 1
+    _save(state, blocks, folded, summary)
+    return _with_summary(summary, recent)
+
+
+async def aassemble_history(history, asummarize=None, budget=HISTORY_TOKEN_BUDGET, state=None,
+                            max_calls=SUMMARY_CALLS_PER_TURN):
+    blocks, recent = split_history(history, budget)
+    summary, folded = _resume(blocks, state)
+    calls = 0
+    for block in blocks[folded:]:
+        if asummarize is None:
+            break
+        prompt = summary_prompt(summary, block)
+        key = result_key(SUMMARY_PROMPT, SUMMARY_MODEL, prompt=prompt)
+        cached = llm_results.get(key)
+        if cached is None:
+            if calls >= max_calls:
+                break
+            calls += 1
+            try:
+                cached = _clip(await asummarize(prompt))
+            except Exception as e:
+                report_error("summarize", e)
+                break
+            llm_results.set(key, cached)
+        summary = cached
+        folded += 1
+    _save(state, blocks, folded, summary)
+    return _with_summary(summary, recent)
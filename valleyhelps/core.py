@@ -0,0 +1,337 @@
+"""HR assistant logic shared by the Streamlit UI and the HTTP API.
+
+Nothing in here touches Streamlit. Functions take an OpenAI client (sync or
+async) and plain Python values, and raise on failure; callers decide how to
+surface errors.
+"""
+import asyncio
+import io
+import json
+
+from valleyhelps.answers import answer_cache, is_standalone
+from valleyhelps.cache import content_hash, llm_results, result_key
+from valleyhelps.context import SUMMARY_MODEL, SUMMARY_TOKENS, aassemble_history, assemble_history
+from valleyhelps.download import fetch
+from valleyhelps.metrics import span
+from valleyhelps.events import (
+    EVENT_BATCH_PROMPT, EVENTS_FALLBACK_N, EVENTS_MODEL,
+    build_event_index, rank_events, score_events, score_events_async, shortlist_events,
+)
+from valleyhelps.retrieval import EMBEDDING_MODEL, count_tokens
+from valleyhelps.scheduler import BATCH, INTERACTIVE, async_openai_client, openai_client, scheduler
+from valleyhelps.skills import format_comparison, prescore
+
+CHAT_MODEL = "gpt-4o-mini"
+CHAT_MAX_TOKENS = 500
+CHAT_TEMPERATURE = 0.7
+
+SYSTEM_PROMPT = "You are ValleyHelps, an HR assistant chatbot for Valley Water. Be helpful, friendly, and concise. When someone brings up a job or resume, inform them of the career planning tool. If the topic is workshops or events, bring up the events exploration tool."
+
+CAREER_MATCH_SYSTEM = "You are an HR system focusing on internal employee growth."
+CAREER_MATCH_PROMPT = """
+Compare the following resume to the desired job description and provide a match score (0-100).
+Additionally, identify missing skills or qualifications and suggest ways to bridge the gap.
+
+Resume:
+{resume_text}
+
+Job Description:
+{job_desc_text}
+"""
+
+# used when the local pre-score could read the posting; the model sees the comparison, not the documents
+CAREER_MATCH_STRUCTURED_PROMPT = """
+A resume was compared to a job description. The comparison below was computed from both documents,
+and the match score is final.
+
+{comparison}
+
+Start your reply with "Match Score: {score}/100". Then briefly explain what the score reflects, identify
+missing skills or qualifications, and suggest ways to bridge the gap.
+"""
+
+GROWTH_PLAN_SYSTEM = "You are an HR system providing career development advice."
+GROWTH_PLAN_PROMPT = """
+Based on the selected career goal: {career_goal}, and the match analysis above, suggest tailored growth plans.
+
+Include these available resources from the company:
+{resources}
+"""
+
+EVENTS_SUMMARY_SYSTEM = "You are an expert career planner."
+EVENTS_SUMMARY_PROMPT = """
+Based on the user's match analysis and career goal of "{career_goal}", the following events were identified as relevant:
+
+{event_details}
+
+Generate a concise summary explaining how these events collectively support the user's career development and help them achieve their goals.
+"""
+
+
+# ─── Knowledge Base ─────────────────────────────────────────────────────────────
+def download_pdf(url):
+    """The PDF at `url` as a BytesIO, or None if the server refused it."""
+    result = fetch(url)
+    if result is None:
+        return None
+    path, _ = result
+    return io.BytesIO(path.read_bytes())
+
+
+def embedder(client):
+    def embed(texts):
+        resp = scheduler.call(
+            "embeddings", client.embeddings.with_raw_response.create, priority=BATCH,
+            tokens=sum(count_tokens(t) for t in texts), model=EMBEDDING_MODEL, input=texts,
+        )
+        return [d.embedding for d in resp.data]
+    return embed
+
+
+def retrieve_kb_context(kb_index, prompt, history):
+    if not kb_index:
+        return ""
+    # include the previous user turn so follow-up questions keep their topic
+    previous = next((e["content"] for e in reversed(history) if e["role"] == "user"), "")
+    with span("retrieve"):
+        return kb_index.context(f"{previous}\n{prompt}")
+
+
+# ─── Chat ───────────────────────────────────────────────────────────────────────
+def summarizer(client):
+    def summarize(prompt):
+        resp = scheduler.call(
+            "chat", client.chat.completions.with_raw_response.create,
+            tokens=count_tokens(prompt) + SUMMARY_TOKENS, model=SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}], max_tokens=SUMMARY_TOKENS,
+        )
+        return resp.choices[0].message.content.strip()
+    return summarize
+
+
+def async_summarizer(aclient):
+    async def summarize(prompt):
+        resp = await scheduler.acall(
+            "chat", aclient.chat.completions.with_raw_response.create,
+            tokens=count_tokens(prompt) + SUMMARY_TOKENS, model=SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}], max_tokens=SUMMARY_TOKENS,
+        )
+        return resp.choices[0].message.content.strip()
+    return summarize
+
+
+def _system_message(prompt, history, kb_index, sys_prompt):
+    if sys_prompt is not None:
+        return {"role": "system", "content": sys_prompt}
+    sys = SYSTEM_PROMPT
+    kb_context = retrieve_kb_context(kb_index, prompt, history)
+    if kb_context:
+        sys += "\n\nKnowledge Base:\n" + kb_context
+    return {"role": "system", "content": sys}
+
+
+def build_chat_messages(prompt, history, kb_index=None, sys_prompt=None, summarize=None, summary_state=None):
+    """System prompt, the history fitted to its token budget, then the new prompt.
+
+    `summary_state` keeps a conversation's running summary between turns.
+    """
+    with span("prompt"):
+        return [
+            _system_message(prompt, history, kb_index, sys_prompt),
+            *assemble_history(history, summarize, state=summary_state),
+            {"role": "user", "content": prompt},
+        ]
+
+
+async def abuild_chat_messages(prompt, history, kb_index=None, sys_prompt=None, asummarize=None):
+    with span("prompt"):
+        # retrieval may embed the query through the sync client, so keep it off the event loop
+        system = await asyncio.to_thread(_system_message, prompt, history, kb_index, sys_prompt)
+        return [
+            system,
+            *await aassemble_history(history, asummarize),
+            {"role": "user", "content": prompt},
+        ]
+
+
+def message_tokens(msgs, max_tokens=CHAT_MAX_TOKENS):
+    """Rough token cost of a chat request, for the scheduler's token bucket."""
+    return sum(count_tokens(m["content"]) for m in msgs) + max_tokens
+
+
+def _chat_kwargs(msgs, model):
+    return {
+        "tokens": message_tokens(msgs), "model": model, "messages": msgs,
+        "max_tokens": CHAT_MAX_TOKENS, "temperature": CHAT_TEMPERATURE,
+    }
+
+
+def _answer_scope(kb_index, model, sys_prompt):
+    """Cache scope for HR chat answers, or None when the answer shouldn't be cached."""
+    if sys_prompt is not None:
+        return None
+    return result_key(SYSTEM_PROMPT, model, kb=kb_index.version if kb_index else "")
+
+
+def cached_answer(prompt, history, kb_index=None, model=CHAT_MODEL, sys_prompt=None):
+    scope = _answer_scope(kb_index, model, sys_prompt)
+    if scope is None or not is_standalone(prompt, history):
+        return None
+    return answer_cache.get(prompt, scope)
+
+
+def remember_answer(prompt, history, answer, kb_index=None, model=CHAT_MODEL, sys_prompt=None):
+    scope = _answer_scope(kb_index, model, sys_prompt)
+    if scope is not None and answer and is_standalone(prompt, history):
+        answer_cache.set(prompt, scope, answer)
+
+
+def chat(client, prompt, history, kb_index=None, model=CHAT_MODEL, sys_prompt=None, summary_state=None):
+    answer = cached_answer(prompt, history, kb_index, model, sys_prompt)
+    if answer is not None:
+        return answer
+    msgs = build_chat_messages(prompt, history, kb_index, sys_prompt, summarizer(client), summary_state)
+    resp = scheduler.call("chat", client.chat.completions.with_raw_response.create, **_chat_kwargs(msgs, model))
+    answer = resp.choices[0].message.content
+    remember_answer(prompt, history, answer, kb_index, model, sys_prompt)
+    return answer
+
+
+def stream_chat(client, prompt, history, kb_index=None, model=CHAT_MODEL, sys_prompt=None, summary_state=None):
+    answer = cached_answer(prompt, history, kb_index, model, sys_prompt)
+    if answer is not None:
+        yield answer
+        return
+    msgs = build_chat_messages(prompt, history, kb_index, sys_prompt, summarizer(client), summary_state)
+    stream = scheduler.stream(
+        "chat", client.chat.completions.with_raw_response.create, **_chat_kwargs(msgs, model),
+        stream=True, stream_options={"include_usage": True},
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield parts[-1]
+    remember_answer(prompt, history, "".join(parts), kb_index, model, sys_prompt)
+
+
+async def achat(aclient, prompt, history, kb_index=None, model=CHAT_MODEL, sys_prompt=None):
+    answer = cached_answer(prompt, history, kb_index, model, sys_prompt)
+    if answer is not None:
+        return answer
+    msgs = await abuild_chat_messages(prompt, history, kb_index, sys_prompt, async_summarizer(aclient))
+    resp = await scheduler.acall("chat", aclient.chat.completions.with_raw_response.create, **_chat_kwargs(msgs, model))
+    answer = resp.choices[0].message.content
+    remember_answer(prompt, history, answer, kb_index, model, sys_prompt)
+    return answer
+
+
+async def astream_chat(aclient, prompt, history, kb_index=None, model=CHAT_MODEL, sys_prompt=None):
+    answer = cached_answer(prompt, history, kb_index, model, sys_prompt)
+    if answer is not None:
+        yield answer
+        return
+    msgs = await abuild_chat_messages(prompt, history, kb_index, sys_prompt, async_summarizer(aclient))
+    stream = scheduler.astream(
+        "chat", aclient.chat.completions.with_raw_response.create, **_chat_kwargs(msgs, model),
+        stream=True, stream_options={"include_usage": True},
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield parts[-1]
+    remember_answer(prompt, history, "".join(parts), kb_index, model, sys_prompt)
+
+
+# ─── Career Planning ────────────────────────────────────────────────────────────
+def cached_completion(client, system, template, model=CHAT_MODEL, priority=INTERACTIVE, **inputs):
+    # identical (template, model, inputs) never trigger a second API call within the TTL
+    def compute():
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": template.format(**inputs)},
+        ]
+        completion = scheduler.call(
+            "chat", client.chat.completions.with_raw_response.create, priority=priority,
+            tokens=message_tokens(messages), model=model, messages=messages,
+        )
+        return completion.choices[0].message.content.strip()
+
+    return llm_results.get_or_compute(result_key(system + template, model, **inputs), compute)
+
+
+def career_match(client, resume_text, job_desc_text, priority=INTERACTIVE, comparison=None):
+    """Match analysis; `comparison` is the skills.prescore() result if already computed."""
+    comparison = comparison or prescore(resume_text, job_desc_text)
+    if comparison["comparable"] and comparison["score"] is not None:
+        return cached_completion(
+            client, CAREER_MATCH_SYSTEM, CAREER_MATCH_STRUCTURED_PROMPT, priority=priority,
+            score=comparison["score"], comparison=format_comparison(comparison),
+        )
+    return cached_completion(
+        client, CAREER_MATCH_SYSTEM, CAREER_MATCH_PROMPT, priority=priority,
+        resume_text=resume_text, job_desc_text=job_desc_text,
+    )
+
+
+def growth_plan(client, career_goal, resource_texts):
+    resources = "".join(t for t in resource_texts if t) if resource_texts else "No resources uploaded."
+    return cached_completion(
+        client, GROWTH_PLAN_SYSTEM, GROWTH_PLAN_PROMPT,
+        career_goal=career_goal, resources=resources,
+    )
+
+
+# ─── Events ─────────────────────────────────────────────────────────────────────
+def _events_key(rows, match_analysis, career_goal):
+    return result_key(
+        EVENT_BATCH_PROMPT, EVENTS_MODEL,
+        events=content_hash(json.dumps(rows, default=str)),
+        match_analysis=match_analysis, career_goal=career_goal,
+    )
+
+
+def recommend_events(api_key, rows, match_analysis, career_goal, index=None):
+    """Return (relevant event IDs, scoring error or None).
+
+    `rows` is a list of (id, name, description). When the model can't be
+    reached, the best keyword matches are returned along with the error.
+    """
+    ranked = rank_events(index or build_event_index(rows), match_analysis, career_goal)
+    candidates = shortlist_events(rows, ranked)
+    try:
+        ids = llm_results.get_or_compute(
+            _events_key(rows, match_analysis, career_goal),
+            lambda: score_events(api_key, candidates, match_analysis, career_goal),
+        )
+        return ids, None
+    except Exception as e:
+        if not ranked:
+            raise
+        return ranked[:EVENTS_FALLBACK_N], e
+
+
+async def arecommend_events(aclient, rows, match_analysis, career_goal, index=None):
+    ranked = rank_events(index or build_event_index(rows), match_analysis, career_goal)
+    key = _events_key(rows, match_analysis, career_goal)
+    ids = llm_results.get(key)
+    if ids is not None:
+        return ids, None
+    try:
+        ids = await score_events_async(aclient, shortlist_events(rows, ranked), match_analysis, career_goal)
+    except Exception as e:
+        if not ranked:
+            raise
+        return ranked[:EVENTS_FALLBACK_N], e
+    llm_results.set(key, ids)
+    return ids, None
+
+
+def events_summary(client, career_goal, relevant):
+    """`relevant` is a list of (name, description) pairs."""
+    event_details = "\n".join(f"{name}: {description}" for name, description in relevant)
+    return cached_completion(
+        client, EVENTS_SUMMARY_SYSTEM, EVENTS_SUMMARY_PROMPT,
+        career_goal=career_goal, event_details=event_details,
+    )
@@ -0,0 +1,135 @@
+"""Bounded, cached HTTP downloads.
+
+The process shares one pooled requests.Session, with connect and read
+timeouts on every request. A response body is streamed in chunks to a spool
+file in the cache directory and hashed as it arrives. The download aborts
+once it passes the size cap, so a large response is never held in memory.
+
+The last body of each URL is kept on disk with its ETag / Last-Modified.
+The next fetch sends If-None-Match / If-Modified-Since, so an unchanged
+document costs one 304 and is read back from disk. If the server can't be
+reached, the cached copy is used. The metadata file is removed together
+with its body when the cache is pruned.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from valleyhelps.cache import MB, DiskCache, content_hash
+from valleyhelps.metrics import metrics, report_error, timed
+
+DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv("VALLEYHELPS_DOWNLOAD_CONNECT_TIMEOUT", "5"))
+DOWNLOAD_READ_TIMEOUT = float(os.getenv("VALLEYHELPS_DOWNLOAD_READ_TIMEOUT", "30"))
+DOWNLOAD_MAX_MB = int(os.getenv("VALLEYHELPS_DOWNLOAD_MAX_MB", "50"))
+DOWNLOAD_CACHE_MB = int(os.getenv("VALLEYHELPS_DOWNLOAD_CACHE_MB", "512"))
+CHUNK_BYTES = 64 * 1024
+
+
+class DownloadTooLarge(ValueError):
+    pass
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # requests is imported with the first download rather than with the app
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _drop_meta(path):
+    path.with_suffix(".json").unlink(missing_ok=True)
+
+
+downloads = DiskCache(Path("cache") / "downloads", DOWNLOAD_CACHE_MB * MB, suffix=".bin", on_evict=_drop_meta)
+metrics.register("download_cache", downloads.stats)
+
+
+def _meta_path(key):
+    return downloads.directory / f"{key}.json"
+
+
+def _read_meta(key):
+    """Validators and hash of the cached body, or None when there is no usable copy."""
+    try:
+        meta = json.loads(_meta_path(key).read_text())
+    except (OSError, ValueError):
+        return None
+    return meta if downloads.path(key).exists() else None
+
+
+def _write_meta(key, meta):
+    path = _meta_path(key)
+    # unique per writer: concurrent fetches of one URL must not share a temp file
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as f:
+        json.dump(meta, f)
+    os.replace(f.name, path)
+
+
+def _spool(key, response, max_bytes):
+    length = int(response.headers.get("Content-Length") or 0)
+    if length > max_bytes:
+        raise DownloadTooLarge(f"Download is {length / MB:.1f} MB; the limit is {max_bytes / MB:.0f} MB")
+    tmp = downloads.temp_path(key)
+    digest, size = hashlib.sha256(), 0
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadTooLarge(f"Download exceeds the {max_bytes / MB:.0f} MB limit")
+                digest.update(chunk)
+                f.write(chunk)
+        return downloads.put_file(key, tmp), digest.hexdigest(), size
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+@timed("download")
+def fetch(url, max_bytes=DOWNLOAD_MAX_MB * MB):
+    """Return (path, sha256) of the current body of `url`, or None for a non-200 response."""
+    import requests
+
+    key = content_hash(url)
+    meta = _read_meta(key)
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        with get_session().get(
+            url, headers=headers, stream=True, timeout=(DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)
+        ) as r:
+            if r.status_code == 304 and meta:
+                path = downloads.path(key)
+                os.utime(path)  # recently used, so eviction keeps it
+                return path, meta["sha256"]
+            if r.status_code != 200:
+                return None
+            path, sha256, size = _spool(key, r, max_bytes)
+            _write_meta(key, {
+                "url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"),
+                "sha256": sha256, "size": size,
+            })
+            return path, sha256
+    except requests.RequestException as e:
+        if meta is None:
+            raise
+        report_error("download", e, url=url, fallback="cached copy")
+        return downloads.path(key), meta["sha256"]
@@ -0,0 +1,102 @@
+"""Event relevance scoring.
+
+A local BM25 ranking over event names and descriptions shortlists candidates,
+so only the top few reach the model. The shortlist is sent in batches, and
+each batch asks for the IDs of the relevant events as JSON. Batches run
+concurrently through the async client under a bounded semaphore, in the
+scheduler's batch lane so interactive chat is served first.
+"""
+import asyncio
+import json
+import os
+
+from valleyhelps.retrieval import BM25Index, count_tokens
+from valleyhelps.scheduler import BATCH, async_openai_client, scheduler
+
+EVENTS_MODEL = "gpt-4o-mini"
+EVENT_BATCH_SIZE = int(os.getenv("VALLEYHELPS_EVENT_BATCH_SIZE", "20"))
+EVENT_CONCURRENCY = int(os.getenv("VALLEYHELPS_EVENT_CONCURRENCY", "4"))
+EVENTS_TOP_N = int(os.getenv("VALLEYHELPS_EVENTS_TOP_N", "30"))
+EVENTS_FALLBACK_N = 5
+
+EVENT_BATCH_PROMPT = """
+    The user has the following career goal: "{career_goal}". Based on the following match analysis:
+    "{match_analysis}", assess which of the following events would help the user achieve their goal:
+
+    Events:
+    {listing}
+
+    Respond with a JSON object of the form {{"relevant_ids": [<event id>, ...]}} listing only the IDs
+    of the relevant events. Use an empty list if none are relevant.
+    """
+
+
+def batch_prompt(batch, match_analysis, career_goal):
+    listing = "\n".join(f"[{event_id}] {name}: {description}" for event_id, name, description in batch)
+    return EVENT_BATCH_PROMPT.format(career_goal=career_goal, match_analysis=match_analysis, listing=listing)
+
+
+# ─── Local Pre-Filter ───────────────────────────────────────────────────────────
+def build_event_index(events):
+    index = BM25Index()
+    for event_id, name, description in events:
+        index.add(event_id, f"{name}\n{description}")
+    return index
+
+
+def rank_events(index, match_analysis, career_goal, top_n=EVENTS_TOP_N):
+    """Event IDs that share vocabulary with the goal and analysis, best first."""
+    return [event_id for event_id, _ in index.search(f"{career_goal}\n{match_analysis}", top_n)]
+
+
+def shortlist_events(events, ranked, top_n=EVENTS_TOP_N):
+    # keyword hits first, then pad in catalog order so purely semantic matches still get a look
+    if len(events) <= top_n:
+        return list(events)
+    chosen = set(ranked[:top_n])
+    for event_id, _, _ in events:
+        if len(chosen) >= top_n:
+            break
+        chosen.add(event_id)
+    return [event for event in events if event[0] in chosen]
+
+
+# ─── LLM Scoring ────────────────────────────────────────────────────────────────
+def parse_relevant_ids(content, batch):
+    allowed = {event_id for event_id, _, _ in batch}
+    ids = json.loads(content).get("relevant_ids", [])
+    return {int(event_id) for event_id in ids if str(event_id).lstrip("-").isdigit() and int(event_id) in allowed}
+
+
+async def _score_batch(client, semaphore, batch, match_analysis, career_goal, model):
+    messages = [
+        {"role": "system", "content": "You are an intelligent career planner."},
+        {"role": "user", "content": batch_prompt(batch, match_analysis, career_goal)},
+    ]
+    async with semaphore:
+        completion = await scheduler.acall(
+            "chat", client.chat.completions.with_raw_response.create, priority=BATCH,
+            tokens=sum(count_tokens(m["content"]) for m in messages) + 16 * len(batch),
+            model=model, messages=messages, response_format={"type": "json_object"},
+        )
+    return parse_relevant_ids(completion.choices[0].message.content, batch)
+
+
+async def score_events_async(client, events, match_analysis, career_goal, model=EVENTS_MODEL,
+                             batch_size=EVENT_BATCH_SIZE, concurrency=EVENT_CONCURRENCY):
+    """`events` is a list of (id, name, description); returns the relevant IDs in input order."""
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+    results = await asyncio.gather(
+        *(_score_batch(client, semaphore, batch, match_analysis, career_goal, model) for batch in batches)
+    )
+    relevant = set().union(*results) if results else set()
+    return [event_id for event_id, _, _ in events if event_id in relevant]
+
+
+def score_events(api_key, events, match_analysis, career_goal, **kwargs):
+    async def run():
+        async with async_openai_client(api_key) as client:
+            return await score_events_async(client, events, match_analysis, career_goal, **kwargs)
+
+    return asyncio.run(run())
@@ -0,0 +1,174 @@
+"""Offline knowledge base ingestion.
+
+    python -m valleyhelps.ingest https://example.org/handbook.pdf policies/ [--out kb] [--embeddings]
+
+Sources can be URLs, PDF or text files, folders and zip archives. URLs are
+downloaded concurrently through the cached downloader. Text is extracted in
+parallel through the shared PDF cache. Each document is then chunked and
+indexed, and the result is written as one artifact directory:
+
+    manifest.json      format, KB version, chunking settings, and per-document
+                       id (text hash), name, source, chunk and token counts
+    <id>.txt           extracted text
+    <id>.chunks        chunk texts, back to back (UTF-8)
+    <id>.json          chunk offsets, BM25 postings and lengths
+    <id>.npy           normalized embedding matrix (with --embeddings)
+
+Point VALLEYHELPS_KB_ARTIFACT at the directory and the app and the API load
+it at startup instead of downloading DEFAULT_KB_URL. Loading reads only the
+small JSON files. Texts, chunks and vectors are memory-mapped and shared
+through the page cache. The manifest's version is a hash of the indexed
+contents, so rebuilding from the same documents gives the same version.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from valleyhelps import core
+from valleyhelps.batch import extract_documents, read_documents
+from valleyhelps.cache import content_hash
+from valleyhelps.download import fetch
+from valleyhelps.kb_store import kb_store
+from valleyhelps.retrieval import CHUNK_OVERLAP, CHUNK_WORDS, EMBEDDING_MODEL, DocumentIndex, KnowledgeIndex
+
+KB_ARTIFACT = os.getenv("VALLEYHELPS_KB_ARTIFACT", "")
+ARTIFACT_FORMAT = 1
+INGEST_WORKERS = int(os.getenv("VALLEYHELPS_INGEST_WORKERS", "8"))
+
+
+# ─── Sources ────────────────────────────────────────────────────────────────────
+def _is_url(source):
+    return source.startswith(("http://", "https://"))
+
+
+def _download(url):
+    result = fetch(url)
+    if result is None:
+        raise ValueError(f"Failed to fetch {url}")
+    name = url.rstrip("/").split("/")[-1] or url
+    if not name.lower().endswith((".pdf", ".txt")):
+        name += ".pdf"
+    return name, result[0].read_bytes()
+
+
+def read_sources(sources, workers=INGEST_WORKERS):
+    """(name, source, bytes) for every document named by the given URLs and paths."""
+    urls = [s for s in sources if _is_url(s)]
+    with ThreadPoolExecutor(max(1, min(workers, len(urls) or 1))) as executor:
+        downloaded = dict(zip(urls, executor.map(_download, urls)))
+    documents = []
+    for source in sources:
+        if _is_url(source):
+            name, data = downloaded[source]
+            documents.append((name, source, data))
+            continue
+        folder = Path(source).is_dir()
+        for name, data in read_documents(source):
+            documents.append((name, str(Path(source) / name) if folder else source, data))
+    return documents
+
+
+# ─── Artifact ───────────────────────────────────────────────────────────────────
+def build_artifact(documents, out, embed=None):
+    """Index (name, source, text) triples and write them to the directory `out`.
+
+    The artifact is written next to `out` and swapped in when complete, so a
+    running app never sees a half-written one.
+    """
+    out = Path(out)
+    tmp = out.with_name(f".{out.name}.{uuid.uuid4().hex}.tmp")
+    tmp.mkdir(parents=True)
+    try:
+        index, entries = KnowledgeIndex(embed), []
+        for name, source, text in documents:
+            doc_id = content_hash(text)
+            if doc_id in index.documents:
+                continue
+            (tmp / f"{doc_id}.txt").write_text(text, encoding="utf-8")
+            segment = DocumentIndex.build(doc_id, text, embed=embed)
+            segment.save(tmp)
+            index.attach(segment)
+            entries.append({
+                "id": doc_id, "name": name, "source": source,
+                "chunks": len(segment.chunks), "tokens": segment.total_tokens,
+            })
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "version": index.version,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "chunk_words": CHUNK_WORDS,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "embedding_model": EMBEDDING_MODEL if embed else None,
+            "documents": entries,
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        if out.exists():
+            old = out.with_name(f".{out.name}.{uuid.uuid4().hex}.old")
+            out.rename(old)
+            tmp.rename(out)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            tmp.rename(out)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+def load_artifact(path):
+    """Register an artifact's documents and indexes in the KB store; returns (name, doc id) pairs."""
+    path = Path(path)
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} has artifact format {manifest.get('format')}; expected {ARTIFACT_FORMAT}")
+    # vectors from another embedding model can't be compared with today's query embeddings
+    vectors = manifest.get("embedding_model") == EMBEDDING_MODEL
+    docs = []
+    for entry in manifest["documents"]:
+        segment = DocumentIndex.load(path, entry["id"], vectors=vectors)
+        kb_store.preload(entry["id"], entry["name"], path / f"{entry['id']}.txt", segment)
+        docs.append((entry["name"], entry["id"]))
+    return docs
+
+
+# ─── CLI ────────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Build a prebuilt knowledge base artifact from PDFs and text files.")
+    parser.add_argument("sources", nargs="+", help="URL, file, folder or zip archive (PDF or text)")
+    parser.add_argument("--out", default="kb", help="artifact directory (default: kb)")
+    parser.add_argument("--embeddings", action="store_true", help=f"also store {EMBEDDING_MODEL} vectors")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    documents = read_sources(args.sources, args.workers)
+    texts = extract_documents([(name, data) for name, _, data in documents])
+    failed = [(name, text) for name, text in texts if isinstance(text, Exception) or not text]
+    for name, text in failed:
+        print(f"Skipping {name}: {text or 'no text extracted'}", file=sys.stderr)
+    if len(failed) == len(texts):
+        sys.exit("No documents to ingest")
+    print(f"Read {len(texts) - len(failed)} documents in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    embed = core.embedder(core.openai_client()) if args.embeddings else None
+    manifest = build_artifact(
+        [(name, source, text) for (name, source, _), (_, text) in zip(documents, texts)
+         if not isinstance(text, Exception) and text],
+        args.out, embed=embed,
+    )
+    chunks = sum(doc["chunks"] for doc in manifest["documents"])
+    tokens = sum(doc["tokens"] for doc in manifest["documents"])
+    print(f"Wrote {args.out}: {len(manifest['documents'])} documents, {chunks} chunks, ~{tokens} tokens "
+          f"in {time.perf_counter() - start:.1f}s (version {manifest['version'][:12]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Process-wide knowledge base store, deduplicated by document hash.
+
+Sessions keep only document IDs. Each distinct document's text is held once
+per process. Each document is chunked and indexed on its own, once per
+process, and a knowledge base is assembled from those per-document indexes.
+Adding, replacing or removing one document therefore never re-indexes the
+others, and sessions that share a document share its index. With a store directory (the default is cache/kb), texts are also
+written to disk and read through mmap. Worker processes then share a single
+page-cached copy and skip re-extraction of documents another worker already
+stored.
+
+The store is bounded: at most VALLEYHELPS_KB_STORE_DOCS documents stay open
+(an evicted document's mmap is closed, and it is reopened from disk on the
+next use), and the directory is pruned least-recently-used first once it
+exceeds VALLEYHELPS_KB_STORE_MB.
+"""
+import mmap
+import os
+import re
+import threading
+from pathlib import Path
+
+from valleyhelps import core
+from valleyhelps.cache import MB, DiskCache, LRUCache, content_hash
+from valleyhelps.metrics import metrics
+from valleyhelps.pdf import lookup_pdf_text, stream_pdf_text
+from valleyhelps.retrieval import DocumentIndex, KnowledgeIndex
+
+KB_STORE_DIR = os.getenv("VALLEYHELPS_KB_STORE_DIR", str(Path("cache") / "kb"))  # "" keeps texts in memory only
+KB_STORE_DOCS = int(os.getenv("VALLEYHELPS_KB_STORE_DOCS", "256"))
+KB_STORE_MB = int(os.getenv("VALLEYHELPS_KB_STORE_MB", "512"))
+DEFAULT_KB_URL = os.getenv(
+    "VALLEYHELPS_DEFAULT_KB_URL",
+    "https://s3.us-west-1.amazonaws.com/valleywater.org.us-west-1/s3fs-public/Employees%20Association%20MOU%202022-2025.docx%20%283%29.pdf",
+)
+_DOC_ID = re.compile(r"[0-9a-f]{64}")
+
+
+def is_doc_id(value):
+    """Whether `value` is a well-formed document id (the content hash of its text).
+
+    Ids may come from API requests and are joined into store paths, so
+    anything else is rejected before touching the filesystem.
+    """
+    return isinstance(value, str) and _DOC_ID.fullmatch(value) is not None
+
+
+class KBDocument:
+    def __init__(self, doc_id, name, text=None, path=None):
+        self.id = doc_id
+        self.name = name
+        self._text = text
+        self._path = path
+        self._map = None
+        if text is None:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self.size = len(text.encode("utf-8")) if text is not None else len(self._map)
+
+    @property
+    def text(self):
+        if self._text is not None:
+            return self._text
+        try:
+            return self._map[:].decode("utf-8")
+        except ValueError:  # closed on eviction while a caller still held the document
+            return Path(self._path).read_text(encoding="utf-8")
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+class KBStore:
+    def __init__(self, directory=None, max_docs=KB_STORE_DOCS, max_bytes=KB_STORE_MB * MB, max_indexes=32, max_segments=64):
+        self.directory = Path(directory) if directory else None
+        self._files = DiskCache(self.directory, max_bytes, suffix=".txt") if self.directory else None
+        # in-memory texts can't be reopened, so without a directory nothing is evicted
+        self._docs = LRUCache(max_docs if self.directory else float("inf"), on_evict=KBDocument.close)
+        self._urls = LRUCache(max_docs)
+        self._preloaded = {}  # doc id -> (name, path) of artifact documents, reopened from there
+        self._segments = LRUCache(max_segments)  # (doc id, embeddings?) -> DocumentIndex
+        self._indexes = LRUCache(max_indexes)  # (doc ids, embeddings?) -> KnowledgeIndex
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def put(self, text, name=""):
+        doc_id = content_hash(text)
+        if not is_doc_id(doc_id):  # content_hash always is; guards the path below
+            raise ValueError(f"Invalid document id {doc_id!r}")
+        if doc_id in self._docs:
+            return doc_id
+        path = self._path(doc_id)
+        if path and path.exists():
+            os.utime(path)  # recently used, so pruning keeps it
+        elif path:
+            tmp = self._files.temp_path(doc_id)
+            tmp.write_text(text, encoding="utf-8")
+            path = self._files.put_file(doc_id, tmp)
+        self._add(KBDocument(doc_id, name, None if path else text, path))
+        return doc_id
+
+    def put_pdf(self, data, name=""):
+        """Store a PDF's text and return its doc id.
+
+        On a cache miss the keyword index is built from the pages as they are
+        parsed, rather than after the last one.
+        """
+        text = lookup_pdf_text(data)
+        if text is not None:
+            return self.put(text, name)
+        pages = []
+
+        def collect():
+            for page in stream_pdf_text(data):
+                pages.append(page)
+                yield page
+
+        segment = DocumentIndex.build(None, collect())
+        doc_id = self.put("".join(pages), name)
+        segment.id = doc_id
+        if (doc_id, False) not in self._segments:
+            self._segments.set((doc_id, False), segment)
+        return doc_id
+
+    def get(self, doc_id):
+        if not is_doc_id(doc_id):
+            return None
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            # evicted, an artifact document, or stored by another worker
+            name, path = self._preloaded.get(doc_id, ("", self._path(doc_id)))
+            try:
+                if path and path.exists():
+                    os.utime(path)  # recently used, so pruning keeps it
+                    doc = self._add(KBDocument(doc_id, name, path=path))
+            except OSError:  # pruned in between
+                return None
+        return doc
+
+    def _add(self, doc):
+        with self._lock:
+            current = self._docs.get(doc.id)
+            if current is not None:
+                doc.close()
+                return current
+            self._docs.set(doc.id, doc)
+            return doc
+
+    def segment(self, doc_id, embed=None):
+        """Retrieval index over one document, built once and shared; None if unknown."""
+        if not is_doc_id(doc_id):
+            return None
+        key = (doc_id, embed is not None)
+        segment = self._segments.get(key)
+        if segment is None:
+            with self._build_lock:
+                segment = self._segments.get(key)
+                if segment is None:
+                    doc = self.get(doc_id)
+                    if doc is None:
+                        return None
+                    segment = DocumentIndex.build(doc_id, doc.text, embed=embed)
+                    self._segments.set(key, segment)
+        return segment
+
+    def preload(self, doc_id, name, path, segment):
+        """Register a document and its prebuilt index (see valleyhelps.ingest)."""
+        if not is_doc_id(doc_id):
+            raise ValueError(f"Invalid document id {doc_id!r}")
+        self._preloaded[doc_id] = (name, Path(path))
+        self._add(KBDocument(doc_id, name, path=path))
+        self._segments.set((doc_id, False), segment)
+        if segment.vectors is not None:
+            self._segments.set((doc_id, True), segment)
+
+    def index(self, doc_ids, embed=None):
+        """Retrieval index over the given documents, in order.
+
+        Only documents without a cached index are chunked and indexed. Returns
+        None when there are no documents or any of them is unknown.
+        """
+        doc_ids = tuple(dict.fromkeys(doc_ids))
+        if not doc_ids or not all(is_doc_id(doc_id) for doc_id in doc_ids):
+            return None
+        key = (doc_ids, embed is not None)
+        index = self._indexes.get(key)
+        if index is None:
+            index = KnowledgeIndex(embed)
+            for doc_id in doc_ids:
+                segment = self.segment(doc_id, embed)
+                if segment is None:
+                    return None
+                index.attach(segment)
+            self._indexes.set(key, index)
+        return index
+
+    def load_url(self, url):
+        """Download and store a PDF once per process; returns its doc id."""
+        doc_id = self._urls.get(url)
+        if doc_id is None or self.get(doc_id) is None:
+            f = core.download_pdf(url)
+            if f is None:
+                raise ValueError(f"Failed to fetch PDF from {url}")
+            doc_id = self.put_pdf(f.getvalue(), url.split("/")[-1])
+            self._urls.set(url, doc_id)
+        return doc_id
+
+    def stats(self):
+        stats = {"documents": self._docs.stats(), "segments": self._segments.stats(), "indexes": self._indexes.stats()}
+        if self._files:
+            stats["files"] = self._files.stats()
+        return stats
+
+    def _path(self, doc_id):
+        return self._files.path(doc_id) if self._files else None
+
+
+kb_store = KBStore(KB_STORE_DIR or None)
+metrics.register("kb_store", kb_store.stats, label="cache")
@@ -0,0 +1,259 @@
+"""Timing spans, token counts and cache statistics for the hot paths.
+
+    with span("extract"):
+        text = extract_pdf_text(data)
+
+Each span adds its duration to a per-stage histogram, counts failures and
+writes one JSON line to the "valleyhelps" logger. Stages in use: download,
+extract, retrieve, prompt, api (labelled by endpoint: chat, embeddings,
+speech, transcriptions), render in the app and request (by route) in the
+API. Prompt and completion tokens reported by the OpenAI API are summed per
+model. Caches and the scheduler register a stats callable, which is read
+when metrics are exported, so their counters are not duplicated here.
+
+Everything can be read three ways: prometheus() returns the text exposition
+format (served at /metrics by the API, or on VALLEYHELPS_METRICS_PORT by
+the Streamlit app, on 127.0.0.1 unless VALLEYHELPS_METRICS_HOST says
+otherwise), snapshot() feeds the admin dashboard, and the JSON logs
+go to stderr at VALLEYHELPS_LOG_LEVEL (WARNING by default, so only errors).
+"""
+import bisect
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+LOG_LEVEL = os.getenv("VALLEYHELPS_LOG_LEVEL", "WARNING").upper()
+METRICS_PORT = int(os.getenv("VALLEYHELPS_METRICS_PORT", "0"))  # 0: no standalone endpoint
+METRICS_HOST = os.getenv("VALLEYHELPS_METRICS_HOST", "127.0.0.1")  # e.g. 0.0.0.0 for a remote scraper
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RECENT_SPANS = 512  # per stage, for the dashboard's percentiles
+
+log = logging.getLogger("valleyhelps")
+if not log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+
+
+def _event(level, event, **fields):
+    if log.isEnabledFor(level):
+        log.log(level, json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._counters = defaultdict(float)  # (name, labels) -> value
+        self._histograms = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._recent = defaultdict(lambda: deque(maxlen=RECENT_SPANS))
+        self._collectors = {}  # name -> (callable returning a stats dict, label for nested dicts)
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def observe(self, seconds, **labels):
+        key = _labels(labels)
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            counts[-1] += seconds
+            self._recent[key].append(seconds)
+
+    def register(self, name, stats, label="key"):
+        """Export `stats()` (a dict of numbers, or of such dicts) under `name` at read time.
+
+        Nested dicts become `label`-labelled samples, e.g. one per endpoint.
+        """
+        self._collectors[name] = (stats, label)
+
+    def collected(self):
+        out = {}
+        for name, (stats, _) in list(self._collectors.items()):
+            try:
+                out[name] = stats()
+            except Exception as e:
+                _event(logging.WARNING, "collector_error", collector=name, error=str(e))
+        return out
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def snapshot(self):
+        """Per-stage latency, token totals and collected stats, for the dashboard."""
+        with self._lock:
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            recent = {k: list(v) for k, v in self._recent.items()}
+            counters = dict(self._counters)
+        stages = []
+        for key, counts in sorted(histograms.items()):
+            count = sum(counts[:-1])
+            labels = dict(key)
+            stages.append({
+                "stage": labels.pop("stage"),
+                **labels,
+                "count": count,
+                "errors": int(counters.get(("valleyhelps_stage_errors_total", key), 0)),
+                "mean_ms": round(1000 * counts[-1] / count, 1) if count else None,
+                "p50_ms": round(1000 * _percentile(recent[key], 0.5), 1) if recent.get(key) else None,
+                "p95_ms": round(1000 * _percentile(recent[key], 0.95), 1) if recent.get(key) else None,
+            })
+        tokens = defaultdict(dict)
+        for (name, key), value in counters.items():
+            if name == "valleyhelps_tokens_total":
+                labels = dict(key)
+                tokens[labels["model"]][labels["kind"]] = int(value)
+        return {"stages": stages, "tokens": dict(tokens), "stats": self.collected()}
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = ["# TYPE valleyhelps_stage_seconds histogram"]
+        for key, counts in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts[:-1]):
+                cumulative += n
+                lines.append(f"valleyhelps_stage_seconds_bucket{_format_labels(key + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"valleyhelps_stage_seconds_sum{_format_labels(key)} {counts[-1]:.6f}")
+            lines.append(f"valleyhelps_stage_seconds_count{_format_labels(key)} {cumulative}")
+        by_name = defaultdict(list)
+        for (name, key), value in counters.items():
+            by_name[name].append((key, value))
+        for name, samples in sorted(by_name.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(samples))
+        gauges = defaultdict(list)  # samples of one metric must be contiguous
+        for source, stats in sorted(self.collected().items()):
+            for field, labels, value in _flatten(stats, self._collectors[source][1]):
+                gauges[f"valleyhelps_{source}_{field}"].append((labels, value))
+        for name, samples in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {value:g}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats, label, labels=()):
+    # {"hits": 3, "chat": {"active": 1}} -> ("hits", (), 3), ("active", ((label, "chat"),), 1)
+    for field, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, label, labels + ((label, field),))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield field, labels, value
+
+
+metrics = Metrics()
+
+
+# ─── Recording ──────────────────────────────────────────────────────────────────
+@contextmanager
+def span(stage, **labels):
+    """Time a block as `stage`; failures are counted and logged, then re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        seconds = time.perf_counter() - start
+        metrics.observe(seconds, stage=stage, **labels)
+        metrics.inc("valleyhelps_stage_errors_total", stage=stage, **labels)
+        _event(logging.WARNING, "span", stage=stage, ms=round(seconds * 1000, 1), error=repr(e), **labels)
+        raise
+    seconds = time.perf_counter() - start
+    metrics.observe(seconds, stage=stage, **labels)
+    _event(logging.INFO, "span", stage=stage, ms=round(seconds * 1000, 1), **labels)
+
+
+def timed(stage, **labels):
+    """Decorator form of span() for plain and async functions."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(model, usage):
+    """Add an API response's token usage to the per-model totals."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        n = getattr(usage, kind, None)
+        if n:
+            metrics.inc("valleyhelps_tokens_total", n, model=model or "unknown", kind=kind.split("_")[0])
+
+
+def report_error(stage, error, **fields):
+    """Count and log an error that the caller handles (shows, skips or retries)."""
+    metrics.inc("valleyhelps_errors_total", stage=stage)
+    _event(logging.WARNING, "error", stage=stage, error=str(error), **fields)
+
+
+# ─── Standalone Endpoint ────────────────────────────────────────────────────────
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on `host`:`port` from a daemon thread, once per process."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _server_lock:
+        if _server is None and port:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
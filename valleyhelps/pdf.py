@@ -0,0 +1,207 @@
+"""PDF text extraction with a content-hash cache.
+
+Results are keyed by the SHA-256 of the file bytes, so reruns, re-uploads and
+repeat knowledge base loads of the same document skip the parse entirely.
+Large documents are written once to a temp file and split into page ranges
+that are parsed in a process pool (each task carries only the file's path,
+not the bytes) and streamed back in page order; stream_pdf_text() hands the pages on as
+they arrive, so the knowledge base store indexes a document while the rest
+of it is still being parsed. The PDF libraries are imported on first
+extraction, so importing this module (and the app) doesn't pay for them.
+"""
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from valleyhelps.cache import MB, DiskCache, LRUCache, content_hash
+from valleyhelps.metrics import metrics
+
+PDF_TEXT_MEMORY_MB = int(os.getenv("VALLEYHELPS_PDF_TEXT_MEMORY_MB", "64"))
+PDF_TEXT_DISK_MB = int(os.getenv("VALLEYHELPS_PDF_TEXT_DISK_MB", "256"))  # 0 disables the disk tier
+PDF_WORKERS = int(os.getenv("VALLEYHELPS_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = 32
+PARALLEL_MIN_PAGES = 96
+
+_memory = LRUCache(max_entries=256, max_bytes=PDF_TEXT_MEMORY_MB * MB)
+_disk = DiskCache(Path("cache") / "pdf_text", PDF_TEXT_DISK_MB * MB, suffix=".txt") if PDF_TEXT_DISK_MB else None
+
+
+_pools = {}  # worker count -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+
+
+# ─── Page-Range Extraction ──────────────────────────────────────────────────────
+def _extract_range(source, start, stop):
+    # `source` is the PDF bytes, or in a worker process the path of a temp copy;
+    # falls back to PyPDF2 for this range only
+    import fitz  # PyMuPDF
+
+    try:
+        pdf = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source, filetype="pdf")
+        with pdf:
+            return [pdf.load_page(i).get_text("text") for i in range(start, stop)]
+    except Exception:
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+        return [(reader.pages[i].extract_text() or "") + "\n" for i in range(start, stop)]
+
+
+def page_count(data):
+    import fitz
+
+    try:
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            return len(pdf)
+    except Exception:
+        import PyPDF2
+
+        return len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+
+def _iter_pages_serial(data, total):
+    import fitz
+
+    done = 0
+    try:
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            for page in pdf:
+                text = page.get_text("text")
+                done += 1
+                yield text
+    except Exception:
+        yield from _extract_range(data, done, total)
+
+
+def _get_pool(workers):
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+
+def _discard_pool(workers, pool):
+    with _pool_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages(data, workers=PDF_WORKERS):
+    """Yield page texts in order, parsing large documents across worker processes."""
+    total = page_count(data)
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        yield from _iter_pages_serial(data, total)
+        return
+    path, futures = None, []
+    try:
+        # workers read the document from disk, so it isn't pickled into every task
+        with tempfile.NamedTemporaryFile(prefix="valleyhelps-", suffix=".pdf", delete=False) as f:
+            path = f.name
+            f.write(data)
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_extract_range, path, start, min(start + PAGES_PER_TASK, total))
+            for start in range(0, total, PAGES_PER_TASK)
+        ]
+    except Exception as e:
+        for future in futures:
+            future.cancel()
+        if path:
+            os.unlink(path)
+        if isinstance(e, BrokenProcessPool):
+            _discard_pool(workers, pool)
+        yield from iter_pdf_pages(data, workers=1)
+        return
+    done = 0
+    try:
+        for future in futures:
+            try:
+                pages = future.result()
+            except BrokenProcessPool:
+                # a worker died (e.g. out of memory): parse the rest here, and start a fresh pool next time
+                _discard_pool(workers, pool)
+                yield from _extract_range(data, done, total)
+                return
+            done += len(pages)
+            yield from pages
+    finally:
+        for future in futures:
+            future.cancel()
+        os.unlink(path)
+
+
+def extract_pdf_text(data):
+    return "".join(iter_pdf_pages(data))
+
+
+def lookup_pdf_text(data):
+    """The cached text of `data`, or None."""
+    key = content_hash(data)
+    text = _memory.get(key)
+    if text is None and _disk is not None:
+        raw = _disk.get(key)
+        if raw is not None:
+            text = raw.decode("utf-8")
+            _memory.set(key, text)
+    return text
+
+
+def stream_pdf_text(data):
+    """Yield page texts as they are parsed; the joined text is cached once all are read."""
+    pages, seconds = [], 0.0
+    it = iter_pdf_pages(data)
+    while True:
+        start = time.perf_counter()
+        try:
+            page = next(it)
+        except StopIteration:
+            break
+        except Exception:
+            metrics.inc("valleyhelps_stage_errors_total", stage="extract")
+            raise
+        finally:
+            seconds += time.perf_counter() - start  # parse time only, not the consumer's
+        pages.append(page)
+        yield page
+    metrics.observe(seconds, stage="extract")
+    text = "".join(pages)
+    key = content_hash(data)
+    _memory.set(key, text)
+    if _disk is not None:
+        _disk.set(key, text.encode("utf-8"))
+
+
+def cached_pdf_text(data):
+    text = lookup_pdf_text(data)
+    if text is None:
+        text = "".join(stream_pdf_text(data))
+    return text
+
+
+def cached_pdf_texts(blobs):
+    """Extract several documents concurrently; failures come back as exceptions."""
+    def run(data):
+        try:
+            return cached_pdf_text(data)
+        except Exception as e:
+            return e
+
+    if len(blobs) <= 1:
+        return [run(data) for data in blobs]
+    with ThreadPoolExecutor(min(len(blobs), PDF_WORKERS)) as executor:
+        return list(executor.map(run, blobs))
+
+
+def cache_stats():
+    return _memory.stats()
+
+
+metrics.register("pdf_cache", cache_stats)
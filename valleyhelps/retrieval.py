@@ -0,0 +1,332 @@
+"""Chunking and retrieval over the knowledge base.
+
+The knowledge base is split into overlapping word windows when it is loaded.
+Each chat turn then pulls only the best-matching chunks into the system prompt
+instead of the whole document set.
+"""
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+
+# ─── Settings ───────────────────────────────────────────────────────────────────
+KB_TOKEN_BUDGET = int(os.getenv("VALLEYHELPS_KB_TOKEN_BUDGET", "3000"))
+KB_TOP_K = int(os.getenv("VALLEYHELPS_KB_TOP_K", "8"))
+KB_USE_EMBEDDINGS = os.getenv("VALLEYHELPS_KB_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+CHUNK_WORDS = 220
+CHUNK_OVERLAP = 40
+EMBED_BATCH = 96
+RRF_K = 60
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its
+me my of on or our so that the their there this to was we what when where
+which who will with you your
+""".split())
+
+
+def count_tokens(text):
+    # rough estimate (~4 chars per token), good enough for budgeting
+    return (len(text) + 3) // 4 if text else 0
+
+
+def tokenize(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def iter_chunks(pieces, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Chunk a string or a stream of strings (e.g. PDF pages) as they arrive."""
+    if isinstance(pieces, str):
+        pieces = [pieces]
+    step = max(1, chunk_words - overlap)
+    buffer = []
+    for piece in pieces:
+        buffer.extend(piece.split())
+        while len(buffer) > chunk_words:
+            yield " ".join(buffer[:chunk_words])
+            buffer = buffer[step:]
+    if buffer:
+        yield " ".join(buffer)
+
+
+# ─── Lexical Index ──────────────────────────────────────────────────────────────
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk_id: term frequency}
+        self.doc_len = {}
+        self.total_len = 0
+
+    def add(self, chunk_id, text):
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][chunk_id] = tf
+        length = sum(terms.values())
+        self.doc_len[chunk_id] = length
+        self.total_len += length
+
+    def scores(self, terms, n_docs, avg_len, df):
+        """BM25 score of every matching chunk, given collection-wide statistics.
+
+        `df` maps each term to its document frequency across the collection,
+        which may span several indexes (see KnowledgeIndex).
+        """
+        scores = defaultdict(float)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[chunk_id] / avg_len)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, k):
+        n_docs = len(self.doc_len)
+        if not n_docs:
+            return []
+        terms = set(tokenize(query))
+        df = {term: len(self.postings.get(term, ())) for term in terms}
+        scores = self.scores(terms, n_docs, (self.total_len / n_docs) or 1, df)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+# ─── Embedding Index ────────────────────────────────────────────────────────────
+class EmbeddingIndex:
+    """Cosine-similarity index; `embed` maps a list of strings to vectors."""
+
+    def __init__(self, embed):
+        self.embed = embed
+        self.ids = []
+        self.matrix = None
+
+    def add(self, chunk_ids, texts):
+        import numpy as np
+
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH):
+            vectors.extend(self.embed(texts[start:start + EMBED_BATCH]))
+        if not vectors:
+            return
+        block = np.asarray(vectors, dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True) + 1e-12
+        self.matrix = block if self.matrix is None else np.vstack([self.matrix, block])
+        self.ids.extend(chunk_ids)
+
+    def search(self, query, k):
+        return self.search_vector(self.embed([query])[0], k)
+
+    def search_vector(self, vector, k):
+        import numpy as np
+
+        if self.matrix is None:
+            return []
+        q = np.asarray(vector, dtype=np.float32)
+        q /= np.linalg.norm(q) + 1e-12
+        sims = self.matrix @ q
+        top = np.argsort(-sims)[:k]
+        return [(self.ids[i], float(sims[i])) for i in top]
+
+
+# ─── Knowledge Index ────────────────────────────────────────────────────────────
+class MappedChunks(Sequence):
+    """Chunk texts read on demand from a memory-mapped UTF-8 file."""
+
+    def __init__(self, path, offsets):
+        self._offsets = offsets  # byte offsets, one more than there are chunks
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._map[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+
+class DocumentIndex:
+    """Chunks, BM25 postings and (optionally) vectors of a single document."""
+
+    def __init__(self, doc_id, embed=None):
+        self.id = doc_id
+        self.chunks = []
+        self.total_tokens = 0
+        self.bm25 = BM25Index()
+        self.vectors = EmbeddingIndex(embed) if embed else None
+        self.version = hashlib.sha256().hexdigest()
+
+    @classmethod
+    def build(cls, doc_id, text, embed=None):
+        """Index a string or an iterable of page texts, chunk by chunk."""
+        doc = cls(doc_id, embed)
+        digest = hashlib.sha256()
+        for chunk in iter_chunks(text):
+            doc.bm25.add(len(doc.chunks), chunk)
+            digest.update(chunk.encode("utf-8"))
+            doc.total_tokens += count_tokens(chunk)
+            doc.chunks.append(chunk)
+        if doc.vectors is not None and doc.chunks:
+            doc.vectors.add(list(range(len(doc.chunks))), doc.chunks)
+        doc.version = digest.hexdigest()
+        return doc
+
+    def save(self, directory):
+        """Write the index as <id>.chunks (UTF-8 text), <id>.json and, with vectors, <id>.npy."""
+        directory = Path(directory)
+        offsets = [0]
+        with open(directory / f"{self.id}.chunks", "wb") as f:
+            for chunk in self.chunks:
+                offsets.append(offsets[-1] + f.write(chunk.encode("utf-8")))
+        meta = {
+            "version": self.version,
+            "total_tokens": self.total_tokens,
+            "offsets": offsets,
+            "doc_len": [self.bm25.doc_len[i] for i in range(len(self.chunks))],
+            "postings": {term: list(posting.items()) for term, posting in self.bm25.postings.items()},
+        }
+        (directory / f"{self.id}.json").write_text(json.dumps(meta, separators=(",", ":")), encoding="utf-8")
+        if self.vectors is not None and self.vectors.matrix is not None:
+            import numpy as np
+
+            np.save(directory / f"{self.id}.npy", self.vectors.matrix)
+
+    @classmethod
+    def load(cls, directory, doc_id, vectors=True):
+        """Open an index written by save(); chunk texts and vectors stay memory-mapped."""
+        directory = Path(directory)
+        meta = json.loads((directory / f"{doc_id}.json").read_text(encoding="utf-8"))
+        doc = cls(doc_id)
+        doc.version = meta["version"]
+        doc.total_tokens = meta["total_tokens"]
+        doc.chunks = MappedChunks(directory / f"{doc_id}.chunks", meta["offsets"])
+        doc.bm25.doc_len = dict(enumerate(meta["doc_len"]))
+        doc.bm25.total_len = sum(meta["doc_len"])
+        doc.bm25.postings.update((term, dict(posting)) for term, posting in meta["postings"].items())
+        vector_path = directory / f"{doc_id}.npy"
+        if vectors and vector_path.exists():
+            import numpy as np
+
+            # the query is embedded by the KnowledgeIndex, so no embed function is needed here
+            doc.vectors = EmbeddingIndex(None)
+            doc.vectors.matrix = np.load(vector_path, mmap_mode="r")
+            doc.vectors.ids = list(range(len(doc.vectors.matrix)))
+        return doc
+
+    def full_text(self):
+        # consecutive chunks share CHUNK_OVERLAP words
+        parts = self.chunks[:1] + [" ".join(chunk.split()[CHUNK_OVERLAP:]) for chunk in self.chunks[1:]]
+        return " ".join(part for part in parts if part)
+
+
+class KnowledgeIndex:
+    """A knowledge base made of independently indexed documents.
+
+    Adding, replacing or removing a document touches only that document's
+    index, and one DocumentIndex can be shared by many knowledge bases. BM25
+    statistics are combined across documents at query time, so ranking
+    matches a single index over all of them.
+    """
+
+    def __init__(self, embed=None):
+        self.embed = embed
+        self.documents = {}  # doc_id -> DocumentIndex, in document order
+
+    @classmethod
+    def build(cls, text, embed=None):
+        index = cls(embed)
+        index.add_document("text", text)
+        return index
+
+    def add_document(self, doc_id, text):
+        """Index one document from a string or an iterable of page texts."""
+        self.attach(DocumentIndex.build(doc_id, text, self.embed))
+
+    def attach(self, document):
+        # replacing a document keeps its position
+        self.documents[document.id] = document
+
+    def remove_document(self, doc_id):
+        self.documents.pop(doc_id, None)
+
+    @property
+    def chunk_count(self):
+        return sum(len(doc.chunks) for doc in self.documents.values())
+
+    @property
+    def total_tokens(self):
+        return sum(doc.total_tokens for doc in self.documents.values())
+
+    @property
+    def version(self):
+        """Hash of the indexed documents; changes whenever the knowledge base does."""
+        h = hashlib.sha256()
+        for doc_id, doc in self.documents.items():
+            h.update(f"{doc_id}\0{doc.version}\0".encode("utf-8"))
+        return h.hexdigest()
+
+    def search(self, query, k=KB_TOP_K):
+        """Best chunks as (doc_id, chunk number) pairs."""
+        # reciprocal rank fusion when both kinds of index are available
+        pool = k * 3
+        rankings = [self._bm25_search(query, pool)]
+        with_vectors = [doc for doc in self.documents.values() if doc.vectors is not None] if self.embed else []
+        if with_vectors:
+            vector = self.embed([query])[0]
+            hits = [((doc.id, cid), sim) for doc in with_vectors for cid, sim in doc.vectors.search_vector(vector, pool)]
+            rankings.append(heapq.nlargest(pool, hits, key=lambda item: item[1]))
+        fused = defaultdict(float)
+        for ranking in rankings:
+            for rank, (key, _) in enumerate(ranking):
+                fused[key] += 1.0 / (RRF_K + rank)
+        return [key for key, _ in heapq.nlargest(k, fused.items(), key=lambda item: item[1])]
+
+    def _bm25_search(self, query, k):
+        docs = list(self.documents.values())
+        n_docs = sum(len(doc.bm25.doc_len) for doc in docs)
+        if not n_docs:
+            return []
+        avg_len = (sum(doc.bm25.total_len for doc in docs) / n_docs) or 1
+        terms = set(tokenize(query))
+        df = {term: sum(len(doc.bm25.postings.get(term, ())) for doc in docs) for term in terms}
+        hits = [
+            ((doc.id, cid), score)
+            for doc in docs
+            for cid, score in doc.bm25.scores(terms, n_docs, avg_len, df).items()
+        ]
+        return heapq.nlargest(k, hits, key=lambda item: item[1])
+
+    def full_text(self):
+        return "\n\n".join(doc.full_text() for doc in self.documents.values())
+
+    def context(self, query, token_budget=KB_TOKEN_BUDGET, k=KB_TOP_K):
+        # small knowledge bases still go in whole
+        if self.total_tokens <= token_budget:
+            return self.full_text()
+        picked, used = [], 0
+        for doc_id, cid in self.search(query, k):
+            cost = count_tokens(self.documents[doc_id].chunks[cid])
+            if used + cost > token_budget:
+                continue
+            picked.append((doc_id, cid))
+            used += cost
+        # keep document order so neighbouring excerpts read naturally
+        order = {doc_id: i for i, doc_id in enumerate(self.documents)}
+        picked.sort(key=lambda key: (order[key[0]], key[1]))
+        return "\n\n---\n\n".join(self.documents[doc_id].chunks[cid] for doc_id, cid in picked)
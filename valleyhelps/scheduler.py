@@ -0,0 +1,340 @@
+"""Process-wide scheduler for OpenAI requests.
+
+Each endpoint (chat, embeddings, speech, transcriptions) has one limiter. A
+limiter caps the number of in-flight requests and keeps request and token
+buckets in step with the x-ratelimit-* response headers. When a slot frees
+up, interactive callers get it before batch work. Failures worth retrying
+(429s, 5xx, dropped connections) are retried with jittered exponential
+backoff. A 429 also pauses every caller of that endpoint until its
+retry-after passes.
+
+The clients below are built with max_retries=0 so their own retries don't
+stack on top of these. The sync client is shared per API key, so all sessions
+reuse one connection pool. The openai package is imported with the first
+client; it is the slowest import in the app.
+
+Calls pass a `with_raw_response` method so headers can be read:
+
+    scheduler.call("chat", client.chat.completions.with_raw_response.create,
+                   priority=INTERACTIVE, tokens=600, model=..., messages=...)
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from valleyhelps.metrics import metrics, record_usage, span
+
+INTERACTIVE = 0
+BATCH = 1
+
+OPENAI_TIMEOUT = float(os.getenv("VALLEYHELPS_OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("VALLEYHELPS_OPENAI_MAX_RETRIES", "4"))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 20
+ENDPOINT_CONCURRENCY = {
+    "chat": int(os.getenv("VALLEYHELPS_CHAT_CONCURRENCY", "16")),
+    "embeddings": int(os.getenv("VALLEYHELPS_EMBEDDINGS_CONCURRENCY", "4")),
+    "speech": int(os.getenv("VALLEYHELPS_SPEECH_CONCURRENCY", "8")),
+    "transcriptions": int(os.getenv("VALLEYHELPS_TRANSCRIPTIONS_CONCURRENCY", "4")),
+}
+
+
+# ─── Clients ────────────────────────────────────────────────────────────────────
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def openai_client(api_key=None):
+    """Shared client per API key, so every session reuses one connection pool."""
+    import openai
+
+    api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = openai.OpenAI(api_key=api_key, max_retries=0, timeout=OPENAI_TIMEOUT)
+        return _clients[api_key]
+
+
+def async_openai_client(api_key=None):
+    # async connections belong to one event loop, so callers own and close these
+    import openai
+
+    return openai.AsyncOpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY", ""), max_retries=0, timeout=OPENAI_TIMEOUT
+    )
+
+
+# ─── Limits ─────────────────────────────────────────────────────────────────────
+class TokenBucket:
+    """Refills continuously at `limit` per minute; unlimited until a limit is known."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.level = limit
+        self._updated = time.monotonic()
+
+    def delay(self, amount, now):
+        if not self.limit:
+            return 0
+        self._refill(now)
+        amount = min(amount, self.limit)
+        return 0 if self.level >= amount else (amount - self.level) * 60 / self.limit
+
+    def take(self, amount, now):
+        if self.limit:
+            self._refill(now)
+            self.level -= amount
+
+    def update(self, limit, remaining, now):
+        self.limit = limit
+        self.level = remaining
+        self._updated = now
+
+    def _refill(self, now):
+        self.level = min(self.limit, self.level + (now - self._updated) * self.limit / 60)
+        self._updated = now
+
+
+class EndpointLimiter:
+    """Concurrency slots plus request/token buckets, granted in priority order."""
+
+    def __init__(self, name, concurrency):
+        self.name = name
+        self.concurrency = concurrency
+        self.active = 0
+        self.requests = TokenBucket()
+        self.tokens = TokenBucket()
+        self.blocked_until = 0.0
+        self._waiters = []  # heap of [priority, seq, wake]
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority=INTERACTIVE, tokens=0):
+        event = threading.Event()
+        entry = self._enqueue(priority, event.set)
+        try:
+            while True:
+                delay = self._try_acquire(entry, tokens)
+                if delay == 0:
+                    return
+                event.wait(delay)
+                event.clear()
+        except BaseException:
+            self._abandon(entry)
+            raise
+
+    async def aacquire(self, priority=INTERACTIVE, tokens=0):
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        entry = self._enqueue(priority, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                delay = self._try_acquire(entry, tokens)
+                if delay == 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(entry)
+            raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self._wake_next()
+
+    def observe(self, headers):
+        """Resync the buckets from x-ratelimit-limit-* and x-ratelimit-remaining-*."""
+        now = time.monotonic()
+        with self._lock:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                try:
+                    limit = int(headers.get(f"x-ratelimit-limit-{kind}", ""))
+                    remaining = int(headers.get(f"x-ratelimit-remaining-{kind}", ""))
+                except ValueError:
+                    continue
+                bucket.update(limit, remaining, now)
+
+    def backoff(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self.active,
+                "waiting": len(self._waiters),
+                "requests_remaining": self.requests.level,
+                "tokens_remaining": self.tokens.level,
+            }
+
+    def _enqueue(self, priority, wake):
+        entry = [priority, next(self._seq), wake]
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        return entry
+
+    def _try_acquire(self, entry, tokens):
+        """0 once a slot is taken, else seconds to wait (None: until woken)."""
+        with self._lock:
+            if self._waiters[0] is not entry or self.active >= self.concurrency:
+                return None
+            now = time.monotonic()
+            delay = max(self.blocked_until - now, self.requests.delay(1, now), self.tokens.delay(tokens, now))
+            if delay > 0:
+                return delay
+            heapq.heappop(self._waiters)
+            self.active += 1
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self._wake_next()
+            return 0
+
+    def _abandon(self, entry):
+        with self._lock:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            self._wake_next()
+
+    def _wake_next(self):
+        if self._waiters:
+            self._waiters[0][2]()
+
+
+# ─── Retries ────────────────────────────────────────────────────────────────────
+def _retryable(error):
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        return getattr(error, "code", None) != "insufficient_quota"
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return isinstance(error, openai.APIConnectionError)
+
+
+def _retry_after(headers):
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        try:
+            return float(headers.get(header, "")) * scale
+        except ValueError:
+            continue
+    return None
+
+
+# ─── Scheduler ──────────────────────────────────────────────────────────────────
+class Scheduler:
+    def __init__(self, concurrency=None, max_retries=OPENAI_MAX_RETRIES):
+        concurrency = concurrency or ENDPOINT_CONCURRENCY
+        self.limiters = {name: EndpointLimiter(name, n) for name, n in concurrency.items()}
+        self.max_retries = max_retries
+        self.retries = 0
+
+    def call(self, endpoint, create, priority=INTERACTIVE, tokens=0, **kwargs):
+        """Run `create(**kwargs)` under the endpoint's limits; returns the parsed response."""
+        limiter = self.limiters[endpoint]
+        with span("api", endpoint=endpoint):
+            result = self._open(limiter, create, priority, tokens, kwargs)
+        limiter.release()
+        record_usage(kwargs.get("model"), getattr(result, "usage", None))
+        return result
+
+    def stream(self, endpoint, create, priority=INTERACTIVE, tokens=0, **kwargs):
+        """Yield from a streaming response, holding the slot until it is consumed."""
+        limiter = self.limiters[endpoint]
+        with span("api", endpoint=endpoint, stream="true"):  # time to response headers
+            stream = self._open(limiter, create, priority, tokens, kwargs)
+        try:
+            for chunk in stream:
+                # the last chunk carries usage when stream_options={"include_usage": True}
+                record_usage(kwargs.get("model"), getattr(chunk, "usage", None))
+                yield chunk
+        finally:
+            stream.close()
+            limiter.release()
+
+    async def acall(self, endpoint, create, priority=INTERACTIVE, tokens=0, **kwargs):
+        limiter = self.limiters[endpoint]
+        with span("api", endpoint=endpoint):
+            result = await self._aopen(limiter, create, priority, tokens, kwargs)
+        limiter.release()
+        record_usage(kwargs.get("model"), getattr(result, "usage", None))
+        return result
+
+    async def astream(self, endpoint, create, priority=INTERACTIVE, tokens=0, **kwargs):
+        limiter = self.limiters[endpoint]
+        with span("api", endpoint=endpoint, stream="true"):
+            stream = await self._aopen(limiter, create, priority, tokens, kwargs)
+        try:
+            async for chunk in stream:
+                record_usage(kwargs.get("model"), getattr(chunk, "usage", None))
+                yield chunk
+        finally:
+            await stream.close()
+            limiter.release()
+
+    def stats(self):
+        return {"retries": self.retries, **{name: l.stats() for name, l in self.limiters.items()}}
+
+    def _open(self, limiter, create, priority, tokens, kwargs):
+        for attempt in itertools.count():
+            limiter.acquire(priority, tokens)
+            try:
+                raw = create(**kwargs)
+                limiter.observe(raw.headers)
+                return raw.parse()
+            except Exception as e:
+                limiter.release()
+                delay = self._retry_delay(limiter, e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                limiter.release()
+                raise
+            time.sleep(delay)
+
+    async def _aopen(self, limiter, create, priority, tokens, kwargs):
+        for attempt in itertools.count():
+            await limiter.aacquire(priority, tokens)
+            try:
+                raw = await create(**kwargs)
+                limiter.observe(raw.headers)
+                return raw.parse()
+            except Exception as e:
+                limiter.release()
+                delay = self._retry_delay(limiter, e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                limiter.release()
+                raise
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, limiter, error, attempt):
+        """Seconds to wait before retrying, or None if the error should surface."""
+        import openai
+
+        if attempt >= self.max_retries or not _retryable(error):
+            return None
+        delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+        response = getattr(error, "response", None)
+        if response is not None:
+            limiter.observe(response.headers)
+            retry_after = _retry_after(response.headers)
+            if retry_after is not None:
+                delay = min(retry_after, RETRY_MAX_SECONDS) + random.uniform(0, RETRY_BASE_SECONDS)
+        if isinstance(error, openai.RateLimitError):
+            limiter.backoff(delay)
+        self.retries += 1
+        return delay
+
+
+scheduler = Scheduler()
+metrics.register("openai", scheduler.stats, label="endpoint")
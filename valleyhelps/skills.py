@@ -0,0 +1,246 @@
+"""Local skill extraction and a deterministic resume/job pre-score.
+
+Both documents are split into sections by their headings. Skills and
+certifications are matched against a vocabulary, along with stated years of
+experience and degree level. The pre-score compares the two profiles:
+
+    skills 60%, certifications 15%, experience 15%, education 10%
+
+Parts the posting doesn't ask for are left out and the weights renormalized.
+Skills listed under a "preferred" heading count half. The score is
+reproducible and computed without any API call. The career match prompt
+only receives the condensed comparison (see `format_comparison`) instead of
+both documents in full.
+"""
+import re
+
+# canonical name -> aliases (lowercase, matched on word boundaries)
+SKILLS = {
+    "python": ["python"],
+    "sql": ["sql", "t-sql", "pl/sql", "postgresql", "mysql", "sql server"],
+    "r": ["r programming", "rstudio"],
+    "matlab": ["matlab"],
+    "java": ["java"],
+    "javascript": ["javascript", "typescript", "node.js"],
+    "c#": ["c#", ".net"],
+    "excel": ["excel", "spreadsheets", "pivot tables", "vlookup"],
+    "power bi": ["power bi", "powerbi"],
+    "tableau": ["tableau"],
+    "data analysis": ["data analysis", "data analytics", "statistical analysis", "statistics"],
+    "machine learning": ["machine learning"],
+    "gis": ["gis", "arcgis", "esri", "qgis", "geographic information systems"],
+    "autocad": ["autocad", "civil 3d", "microstation"],
+    "scada": ["scada", "plc", "hmi"],
+    "hydraulic modeling": ["hydraulic modeling", "hydraulic modelling", "hec-ras", "hec-hms", "epanet", "watercad"],
+    "hydrology": ["hydrology", "hydrologic", "groundwater", "watershed"],
+    "water quality": ["water quality", "water sampling", "laboratory testing"],
+    "water treatment": ["water treatment", "treatment plant", "wastewater"],
+    "environmental compliance": ["environmental compliance", "ceqa", "nepa", "permitting", "regulatory compliance"],
+    "civil engineering": ["civil engineering", "civil engineer"],
+    "structural engineering": ["structural engineering", "structural design"],
+    "electrical engineering": ["electrical engineering", "electrical systems"],
+    "mechanical engineering": ["mechanical engineering", "pumps", "hvac"],
+    "construction management": ["construction management", "construction inspection", "contract administration"],
+    "asset management": ["asset management", "maintenance management", "cmms", "maximo"],
+    "project management": ["project management", "project manager", "managing projects", "project schedules"],
+    "budgeting": ["budgeting", "budget", "financial planning", "forecasting"],
+    "accounting": ["accounting", "accounts payable", "accounts receivable", "general ledger", "reconciliation"],
+    "procurement": ["procurement", "purchasing", "contracts", "vendor management"],
+    "grant writing": ["grant writing", "grants"],
+    "policy analysis": ["policy analysis", "policy development", "legislative"],
+    "human resources": ["human resources", "recruitment", "recruiting", "onboarding", "benefits administration"],
+    "labor relations": ["labor relations", "collective bargaining", "mou"],
+    "training": ["training", "curriculum", "instructional design"],
+    "public outreach": ["public outreach", "community outreach", "public engagement", "stakeholder engagement"],
+    "communication": ["communication", "communications", "presentations", "public speaking"],
+    "technical writing": ["technical writing", "report writing", "technical reports"],
+    "customer service": ["customer service", "customer support"],
+    "leadership": ["leadership", "supervision", "supervisory", "team lead", "managed a team", "mentoring"],
+    "safety": ["safety", "osha", "hazard analysis", "incident investigation"],
+    "emergency response": ["emergency response", "emergency management", "incident command"],
+    "cybersecurity": ["cybersecurity", "information security", "network security"],
+    "networking": ["networking", "tcp/ip", "cisco", "firewalls"],
+    "cloud": ["aws", "azure", "google cloud", "cloud computing"],
+    "linux": ["linux", "unix"],
+    "database administration": ["database administration", "dba"],
+    "erp": ["erp", "sap", "oracle financials", "peoplesoft", "workday"],
+    "microsoft office": ["microsoft office", "ms office", "microsoft word", "powerpoint"],
+    "field work": ["field work", "fieldwork", "field inspections", "site visits"],
+    "spanish": ["spanish", "bilingual"],
+}
+
+CERTIFICATIONS = {
+    "professional engineer (pe)": [r"professional engineer", r"\bp\.e\.", r"\bpe (?:licen[cs]e|registration|certificate)"],
+    "engineer in training (eit)": [r"engineer[- ]in[- ]training", r"\beit\b"],
+    "pmp": [r"\bpmp\b", r"project management professional"],
+    "cpa": [r"\bcpa\b", r"certified public accountant"],
+    "water treatment operator": [r"water treatment operator", r"\bt[1-5]\b", r"\bgrade t[1-5]\b"],
+    "water distribution operator": [r"distribution operator", r"\bd[1-5]\b"],
+    "wastewater operator": [r"wastewater (?:treatment )?operator"],
+    "gisp": [r"\bgisp\b"],
+    "osha 30": [r"osha[- ]?30"],
+    "osha 10": [r"osha[- ]?10"],
+    "commercial driver license": [r"\bcdl\b", r"commercial driver'?s? licen[cs]e"],
+    "qsd/qsp": [r"\bqs[dp]\b"],
+    "shrm": [r"\bshrm-(?:cp|scp)\b", r"\bphr\b", r"\bsphr\b"],
+    "security+": [r"security\+", r"\bcissp\b"],
+}
+
+DEGREES = [
+    ("doctorate", r"\bph\.?d\b|\bdoctorate\b|\bdoctoral\b"),
+    ("master", r"\bmaster'?s?\b|\bmba\b|\bm\.?[sa]\.?(?=\s+in\b)"),
+    ("bachelor", r"\bbachelor'?s?\b|\bundergraduate degree\b|\bb\.?[sa]\.?(?=\s+in\b)"),
+    ("associate", r"\bassociate'?s? degree\b|\ba\.?a\.?(?=\s+in\b)"),
+]
+DEGREE_LEVELS = {name: len(DEGREES) - i for i, (name, _) in enumerate(DEGREES)}
+
+SECTION_HEADINGS = {
+    "summary": ["summary", "profile", "objective", "about me", "professional summary"],
+    "experience": ["experience", "work experience", "professional experience", "employment history", "work history"],
+    "education": ["education", "education and training"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "areas of expertise"],
+    "certifications": ["certifications", "licenses", "certifications and licenses", "licenses and certifications"],
+    "required": ["requirements", "minimum qualifications", "qualifications", "required qualifications",
+                 "knowledge, skills and abilities", "knowledge skills and abilities", "education and experience"],
+    "preferred": ["preferred qualifications", "desirable qualifications", "desired qualifications", "preferred",
+                  "nice to have", "bonus"],
+    "duties": ["responsibilities", "duties", "essential functions", "examples of duties", "typical duties"],
+}
+SCORE_WEIGHTS = {"skills": 0.6, "certifications": 0.15, "experience": 0.15, "education": 0.1}
+MIN_JOB_REQUIREMENTS = 3  # below this the posting isn't described well enough to pre-score
+
+_HEADING_RE = re.compile(
+    r"^[\s#*•\-]*(" + "|".join(re.escape(h) for hs in SECTION_HEADINGS.values() for h in sorted(hs, key=len, reverse=True))
+    + r")[\s:*]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_HEADING_SECTION = {h: section for section, hs in SECTION_HEADINGS.items() for h in hs}
+_SKILL_RES = {
+    skill: re.compile(r"(?<![\w+#/])(?:" + "|".join(re.escape(a) for a in aliases) + r")(?![\w+#/])")
+    for skill, aliases in SKILLS.items()
+}
+_CERT_RES = {cert: re.compile("|".join(patterns)) for cert, patterns in CERTIFICATIONS.items()}
+_DEGREE_RES = [(name, re.compile(pattern)) for name, pattern in DEGREES]
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:or more\s+)?years?(?:'|’)?\s+(?:of\s+)?(?:\w+\s+){0,3}?experience")
+
+
+# ─── Extraction ─────────────────────────────────────────────────────────────────
+def split_sections(text):
+    """Map section name -> text; anything before the first heading is "header"."""
+    sections = {}
+    matches = list(_HEADING_RE.finditer(text))
+    sections["header"] = text[:matches[0].start()] if matches else text
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        section = _HEADING_SECTION[match.group(1).lower()]
+        sections[section] = sections.get(section, "") + text[match.end():end]
+    return sections
+
+
+def find_skills(text):
+    text = text.lower()
+    return {skill for skill, pattern in _SKILL_RES.items() if pattern.search(text)}
+
+
+def find_certifications(text):
+    text = text.lower()
+    return {cert for cert, pattern in _CERT_RES.items() if pattern.search(text)}
+
+
+def find_degrees(text):
+    text = text.lower()
+    return {name for name, pattern in _DEGREE_RES if pattern.search(text)}
+
+
+def extract_profile(text, is_job=False):
+    """Compact, JSON-friendly summary of a resume or job description."""
+    sections = split_sections(text)
+    years = [int(y) for y in _YEARS_RE.findall(text.lower())]
+    degrees = sorted(find_degrees(sections.get("education", text) if not is_job else text), key=DEGREE_LEVELS.get)
+    profile = {
+        "title": next((line.strip()[:120] for line in text.splitlines() if line.strip()), ""),
+        "skills": sorted(find_skills(text)),
+        "certifications": sorted(find_certifications(text)),
+        # a posting states minimums; for a resume the highest degree and longest stated span count
+        "degree": (degrees[0] if is_job else degrees[-1]) if degrees else None,
+        "years": (min(years) if is_job else max(years)) if years else None,
+    }
+    if is_job:
+        # anything only mentioned under a "preferred" heading is a nice-to-have
+        preferred_text = sections.get("preferred", "")
+        required_text = text.replace(preferred_text, "") if preferred_text else text
+        for key, find in (("skills", find_skills), ("certifications", find_certifications)):
+            required = find(required_text)
+            profile[f"preferred_{key}"] = sorted(find(preferred_text) - required)
+            profile[key] = sorted(required)
+    return profile
+
+
+# ─── Scoring ────────────────────────────────────────────────────────────────────
+def compare_profiles(resume, job):
+    """Deterministic comparison of a resume profile against a job profile."""
+    have = set(resume["skills"])
+    required, preferred = set(job["skills"]), set(job.get("preferred_skills", []))
+    certs_have = set(resume["certifications"])
+    certs_needed, certs_preferred = set(job["certifications"]), set(job.get("preferred_certifications", []))
+
+    def coverage(required, preferred, have):
+        total = len(required) + 0.5 * len(preferred)
+        return (len(required & have) + 0.5 * len(preferred & have)) / total if total else None
+
+    parts = {
+        "skills": coverage(required, preferred, have),
+        "certifications": coverage(certs_needed, certs_preferred, certs_have),
+    }
+    if job["years"]:
+        parts["experience"] = min(1.0, (resume["years"] or 0) / job["years"])
+    if job["degree"]:
+        gap = DEGREE_LEVELS[job["degree"]] - DEGREE_LEVELS.get(resume["degree"], 0)
+        parts["education"] = 1.0 if gap <= 0 else 0.5 if gap == 1 else 0.0
+    parts = {p: v for p, v in parts.items() if v is not None}
+    weight = sum(SCORE_WEIGHTS[p] for p in parts)
+    score = round(100 * sum(SCORE_WEIGHTS[p] * v for p, v in parts.items()) / weight) if weight else None
+
+    return {
+        "score": score,
+        "comparable": len(required | preferred | certs_needed | certs_preferred) >= MIN_JOB_REQUIREMENTS,
+        "job_title": job["title"],
+        "matched_skills": sorted((required | preferred) & have),
+        "missing_skills": sorted(required - have),
+        "missing_preferred_skills": sorted(preferred - have),
+        "other_skills": sorted(have - required - preferred),
+        "matched_certifications": sorted((certs_needed | certs_preferred) & certs_have),
+        "missing_certifications": sorted(certs_needed - certs_have),
+        "missing_preferred_certifications": sorted(certs_preferred - certs_have),
+        "other_certifications": sorted(certs_have - certs_needed - certs_preferred),
+        "years": resume["years"],
+        "years_required": job["years"],
+        "degree": resume["degree"],
+        "degree_required": job["degree"],
+    }
+
+
+def prescore(resume_text, job_text):
+    return compare_profiles(extract_profile(resume_text), extract_profile(job_text, is_job=True))
+
+
+def format_comparison(comparison):
+    """The comparison as a few short lines for the match prompt."""
+    def listing(items):
+        return ", ".join(items) if items else "none"
+
+    lines = [
+        f"Posting: {comparison['job_title']}",
+        f"Matched skills: {listing(comparison['matched_skills'])}",
+        f"Missing required skills: {listing(comparison['missing_skills'])}",
+        f"Missing preferred skills: {listing(comparison['missing_preferred_skills'])}",
+        f"Other candidate skills: {listing(comparison['other_skills'])}",
+        f"Certifications held: {listing(comparison['matched_certifications'] + comparison['other_certifications'])}",
+        f"Missing required certifications: {listing(comparison['missing_certifications'])}",
+        f"Missing preferred certifications: {listing(comparison['missing_preferred_certifications'])}",
+    ]
+    if comparison["years_required"]:
+        lines.append(f"Experience: {comparison['years'] or 'not stated'} years (posting asks {comparison['years_required']}+)")
+    if comparison["degree_required"]:
+        lines.append(f"Education: {comparison['degree'] or 'not stated'} (posting asks {comparison['degree_required']})")
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""Sentence-level text-to-speech pipeline for voice mode.
+
+The streamed reply is cut into sentences as tokens arrive. Each sentence is
+synthesized on a small thread pool while the rest of the reply is still
+being generated, so the first sentence can start playing early.
+
+Synthesized audio is stored under cache/tts, keyed by a hash of (model, voice,
+text). Repeated answers reuse the stored clips without a new API call.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from valleyhelps.cache import MB, DiskCache, content_hash
+from valleyhelps.metrics import metrics
+from valleyhelps.scheduler import scheduler
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "sage"
+TTS_WORKERS = int(os.getenv("VALLEYHELPS_TTS_WORKERS", "3"))
+TTS_CACHE_MB = int(os.getenv("VALLEYHELPS_TTS_CACHE_MB", "128"))
+TTS_CACHE_MAX_AGE_HOURS = float(os.getenv("VALLEYHELPS_TTS_CACHE_MAX_AGE_HOURS", "168"))
+MIN_SENTENCE_CHARS = 40
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n{2,}")
+# whole words only: "programs." ends in "ms." but is not an abbreviation
+_ABBREVIATION = re.compile(r"(?:^|\s)(?:e\.g|i\.e|etc|vs|approx|no|mr|mrs|ms|dr|st)\.$", re.IGNORECASE)
+
+
+# ─── Sentence Splitting ─────────────────────────────────────────────────────────
+class SentenceSplitter:
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add streamed text; return the sentences it completed."""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            # short fragments ("Hi!") and abbreviations ride along with the next sentence
+            if _ABBREVIATION.search(self._buffer, 0, match.start()):
+                continue
+            if match.end() - start >= self.min_chars:
+                sentences.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return [s for s in sentences if s]
+
+    def flush(self):
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail
+
+
+# ─── Pipeline ───────────────────────────────────────────────────────────────────
+class SpeechPipeline:
+    """Feed streamed text in; `clips` holds one future of MP3 bytes per sentence, in order."""
+
+    def __init__(self, synthesize, workers=TTS_WORKERS):
+        self.synthesize = synthesize
+        self.clips = []
+        self._splitter = SentenceSplitter()
+        self._executor = ThreadPoolExecutor(workers)
+
+    def feed(self, text):
+        for sentence in self._splitter.feed(text):
+            self.clips.append(self._executor.submit(self.synthesize, sentence))
+
+    def close(self):
+        tail = self._splitter.flush()
+        if tail:
+            self.clips.append(self._executor.submit(self.synthesize, tail))
+        self._executor.shutdown(wait=False)
+
+
+# ─── Audio Cache ────────────────────────────────────────────────────────────────
+# swept by the background thread in valleyhelps.audio rather than on each write
+tts_cache = DiskCache(
+    Path("cache") / "tts", TTS_CACHE_MB * MB, suffix=".mp3",
+    max_age=TTS_CACHE_MAX_AGE_HOURS * 3600, background_eviction=True,
+)
+metrics.register("tts_cache", tts_cache.stats)
+
+
+def tts_key(text, voice=TTS_VOICE, model=TTS_MODEL):
+    return content_hash(f"{model}\0{voice}\0{text}")
+
+
+def openai_synthesizer(client, model=TTS_MODEL, voice=TTS_VOICE):
+    def synthesize(text):
+        key = tts_key(text, voice, model)
+        audio = tts_cache.get(key)
+        if audio is None:
+            audio = scheduler.call(
+                "speech", client.audio.speech.with_raw_response.create, model=model, voice=voice, input=text
+            ).content
+            tts_cache.set(key, audio)
+        return audio
+    return synthesize
+
+
+# ─── MP3 Timing ─────────────────────────────────────────────────────────────────
+_MP3_KBPS = {
+    "v1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "v2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+FALLBACK_KBPS = 64
+
+
+def mp3_duration(data):
+    """Estimate playback seconds of a constant-bitrate MPEG layer III stream."""
+    start = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        start = 10 + size
+    kbps = FALLBACK_KBPS
+    for i in range(start, min(len(data) - 3, start + 4096)):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            version = (data[i + 1] >> 3) & 0x3
+            index = data[i + 2] >> 4
+            rate = _MP3_KBPS["v1" if version == 3 else "v2"][index] if index < 15 else 0
+            if rate:
+                kbps = rate
+                start = i
+                break
+    return (len(data) - start) * 8 / (kbps * 1000)